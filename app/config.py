@@ -1,11 +1,12 @@
 """
 Configuration module for fussball.de scraping.
 
-Defines constants for base URLs, HTTP timeouts, sleep intervals,
-caching options, and user agent strings.
+Defines constants for base URLs, HTTP timeouts, rate limits,
+connection pool limits, caching options, and user agent strings.
 """
 
 import os
+from typing import Optional
 
 # Base URL for fussball.de
 BASE: str = os.getenv("FBDE_BASE", "https://www.fussball.de")
@@ -15,9 +16,113 @@ REQUEST_TIMEOUT: float = float(os.getenv("REQUEST_TIMEOUT", "20"))
 SLEEP_SEC: float = float(os.getenv("SLEEP_SEC", "0.4"))
 ENRICH_SLEEP_SEC: float = float(os.getenv("ENRICH_SLEEP_SEC", "0.25"))
 
+# Upstream rate limit (token bucket per host, shared by the whole process).
+# Defaults to the old pacing of one request per SLEEP_SEC; 0 disables it.
+RATE_LIMIT_RPS: float = float(
+    os.getenv("RATE_LIMIT_RPS", str(1.0 / SLEEP_SEC if SLEEP_SEC > 0 else 0))
+)
+RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "4"))
+
+# Async client pool & fan-out
+HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+CALENDAR_CONCURRENCY: int = int(os.getenv("CALENDAR_CONCURRENCY", "4"))
+# Calendar ranges are fetched and cached in aligned windows so overlapping
+# queries share entries: "week" (ISO week), "day", "off" (exact range) or
+# "auto" (single-day ranges fetch just that day, longer ones ISO weeks)
+CALENDAR_WINDOW: str = os.getenv("CALENDAR_WINDOW", "auto").strip().lower()
+# Coalesce identical concurrent upstream GETs into one request
+HTTP_SINGLE_FLIGHT: bool = os.getenv("HTTP_SINGLE_FLIGHT", "1") == "1"
+# POST /matches/details: parallel match pages and max. items per request
+MATCH_DETAILS_CONCURRENCY: int = int(os.getenv("MATCH_DETAILS_CONCURRENCY", "8"))
+MATCH_BATCH_MAX: int = int(os.getenv("MATCH_BATCH_MAX", "100"))
+# /matches?enrich=true: parallel detail fetches. Uncached ones may use at most
+# ENRICH_RATE_SHARE of RATE_LIMIT_RPS, so the calendar pages of concurrent
+# requests keep the rest of the upstream budget (0 or >= 1 = no extra limit)
+ENRICH_CONCURRENCY: int = int(os.getenv("ENRICH_CONCURRENCY", "4"))
+ENRICH_RATE_SHARE: float = float(os.getenv("ENRICH_RATE_SHARE", "0.5"))
+
+# HTML parsing: "auto" (lxml if installed), "lxml" or "html.parser"
+HTML_PARSER: str = os.getenv("HTML_PARSER", "auto").strip().lower()
+
 # Caching
 CACHE_DIR: str = os.getenv("CACHE_DIR", ".cache_fussballde")
 USE_CACHE_DEFAULT: bool = os.getenv("USE_CACHE", "1") == "1"
+# "file" (one file per entry below CACHE_DIR) or "sqlite" (single file, WAL).
+# The two do not share entries: switching starts with an empty cache.
+CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "file").strip().lower()
+CACHE_SQLITE_PATH: str = os.getenv(
+    "CACHE_SQLITE_PATH", os.path.join(CACHE_DIR, "cache.sqlite3")
+)
+CACHE_SQLITE_BATCH: int = int(os.getenv("CACHE_SQLITE_BATCH", "32"))
+CACHE_SQLITE_FLUSH_SEC: float = float(os.getenv("CACHE_SQLITE_FLUSH_SEC", "1.0"))
+# zlib level for cached payloads (0 = store uncompressed)
+CACHE_COMPRESS_LEVEL: int = int(os.getenv("CACHE_COMPRESS_LEVEL", "6"))
+
+
+def _ttl_env(name: str, default: str) -> Optional[float]:
+    # "none"/"inf"/negative -> never expires
+    raw = os.getenv(name, default).strip().lower()
+    if raw in ("", "none", "inf", "infinite"):
+        return None
+    ttl = float(raw)
+    return None if ttl < 0 else ttl
+
+
+# Cache TTLs in seconds: live data (today/future calendars, running matches)
+# vs. final data (settled past calendars, finished matches with a score)
+CACHE_TTL_LIVE: Optional[float] = _ttl_env("CACHE_TTL_LIVE", "900")
+CACHE_TTL_FINAL: Optional[float] = _ttl_env("CACHE_TTL_FINAL", "none")
+# Days after match day before a calendar window counts as settled
+CACHE_SETTLE_DAYS: int = int(os.getenv("CACHE_SETTLE_DAYS", "2"))
+
+# Postal-code completions: cache TTL (s), in-memory index size (queries) and
+# shortest fetched query that may answer longer ones from the index
+POSTAL_TTL: Optional[float] = _ttl_env("POSTAL_TTL", str(7 * 24 * 3600))
+POSTAL_INDEX_MAX_QUERIES: int = int(os.getenv("POSTAL_INDEX_MAX_QUERIES", "4096"))
+POSTAL_INDEX_MIN_PREFIX: int = int(os.getenv("POSTAL_INDEX_MIN_PREFIX", "3"))
+# Upstream returns at most this many completions; a result that reaches it
+# may be cut off and never answers longer queries from the index
+POSTAL_UPSTREAM_CAP: int = int(os.getenv("POSTAL_UPSTREAM_CAP", "10"))
+
+# Background calendar sync into a local match store (off without SYNC_PLZS).
+# Windows within SYNC_NEAR_DAYS of today refresh every SYNC_NEAR_INTERVAL
+# seconds, the rest of the horizon every SYNC_FAR_INTERVAL; /matches is
+# served from the store while its data is at most SYNC_MAX_STALE old.
+SYNC_PLZS: str = os.getenv("SYNC_PLZS", "")
+SYNC_DB_PATH: str = os.getenv(
+    "SYNC_DB_PATH", os.path.join(CACHE_DIR, "matches.sqlite3")
+)
+SYNC_PAST_DAYS: int = int(os.getenv("SYNC_PAST_DAYS", "7"))
+SYNC_FUTURE_DAYS: int = int(os.getenv("SYNC_FUTURE_DAYS", "28"))
+SYNC_NEAR_DAYS: int = int(os.getenv("SYNC_NEAR_DAYS", "3"))
+SYNC_NEAR_INTERVAL: float = float(os.getenv("SYNC_NEAR_INTERVAL", "300"))
+SYNC_FAR_INTERVAL: float = float(os.getenv("SYNC_FAR_INTERVAL", "3600"))
+SYNC_TICK_SEC: float = float(os.getenv("SYNC_TICK_SEC", "30"))
+SYNC_MAX_STALE: Optional[float] = _ttl_env("SYNC_MAX_STALE", "86400")
+# Only the holder of the store's sync lease syncs; it renews the lease per
+# window and another worker takes over once it is SYNC_LEASE_TTL s old.
+SYNC_LEASE_TTL: float = float(os.getenv("SYNC_LEASE_TTL", "120"))
+
+# Decoded obfuscation maps: in-process LRU size and retry delay (s) for
+# ids whose CSS/font could not be decoded
+OBF_MAP_CACHE_SIZE: int = int(os.getenv("OBF_MAP_CACHE_SIZE", "256"))
+OBF_NEGATIVE_TTL: float = float(os.getenv("OBF_NEGATIVE_TTL", "300"))
+# Parallel CSS/font downloads for obfuscation ids
+OBF_FETCH_CONCURRENCY: int = int(os.getenv("OBF_FETCH_CONCURRENCY", "8"))
+
+# /metrics instrumentation (0 turns recording into no-ops)
+METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Per-request stage breakdown in a Server-Timing response header; off by
+# default, as it shows clients how the service spends its time
+SERVER_TIMING: bool = os.getenv("SERVER_TIMING", "0") == "1"
+
+# cProfile sampling: share of requests profiled (0 = off), and a token that
+# forces profiling of a request via the X-Profile header (empty = disabled)
+PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join(CACHE_DIR, "profiles"))
 
 # UA
 USER_AGENT: str = os.getenv(
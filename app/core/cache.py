@@ -0,0 +1,524 @@
+import argparse
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Optional, Set, Tuple, Union
+from ..config import (
+    CACHE_DIR,
+    CACHE_BACKEND,
+    CACHE_SQLITE_PATH,
+    CACHE_SQLITE_BATCH,
+    CACHE_SQLITE_FLUSH_SEC,
+    CACHE_TTL_LIVE,
+    CACHE_TTL_FINAL,
+    CACHE_SETTLE_DAYS,
+    CACHE_COMPRESS_LEVEL,
+)
+from .metrics import CACHE_LOOKUPS, CACHE_WRITES
+from .timing import staged
+from .utils import cache_path_for
+
+log = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    data: bytes
+    stored_at: float
+    expires_at: Optional[float] = None  # None = never expires
+    # "zlib" = compressed, "raw" = compression did not help,
+    # "" = written before compression (or with it disabled)
+    encoding: str = ""
+    # upstream validators for conditional revalidation
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.expires_at is None or (now or time.time()) < self.expires_at
+
+
+class CacheBackend:
+    """Storage for cache entries addressed by (category, key)."""
+
+    def get(self, category: str, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, category: str, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+
+class FileCacheBackend(CacheBackend):
+    """One file per entry below ``base_dir/<category>/`` (the original layout).
+
+    Expiry metadata lives next to each entry as "<file>.meta". Entries written
+    before TTLs existed have no sidecar and are treated as live data.
+    """
+
+    _META_SUFFIX = ".meta"
+
+    def __init__(self, base_dir: str = CACHE_DIR):
+        self.base_dir = base_dir
+        # category directories known to exist; reads never create any
+        self._dirs: Set[str] = set()
+
+    def get(self, category: str, key: str) -> Optional[CacheEntry]:
+        path = cache_path_for(category, key, self.base_dir)
+        try:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except FileNotFoundError:
+                return None
+            try:
+                with open(path + self._META_SUFFIX, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                mtime = os.path.getmtime(path)
+                meta = {
+                    "stored_at": mtime,
+                    "expires_at": _expires_at(CACHE_TTL_LIVE, mtime),
+                }
+            return CacheEntry(
+                data,
+                meta.get("stored_at", 0.0),
+                meta.get("expires_at"),
+                meta.get("encoding", ""),
+                meta.get("etag"),
+                meta.get("last_modified"),
+            )
+        except Exception:
+            return None
+
+    def set(self, category: str, key: str, entry: CacheEntry) -> None:
+        path = cache_path_for(category, key, self.base_dir)
+        meta = {
+            "stored_at": entry.stored_at,
+            "expires_at": entry.expires_at,
+            "encoding": entry.encoding,
+        }
+        if entry.etag:
+            meta["etag"] = entry.etag
+        if entry.last_modified:
+            meta["last_modified"] = entry.last_modified
+        d = os.path.dirname(path)
+        if d not in self._dirs:
+            os.makedirs(d, exist_ok=True)
+            self._dirs.add(d)
+        _atomic_write(path, entry.data)
+        _atomic_write(path + self._META_SUFFIX, json.dumps(meta).encode("utf-8"))
+
+    def iter_entries(self) -> Iterator[Tuple[str, str, CacheEntry]]:
+        """Every stored ``(category, key, entry)``; keys as stored on disk."""
+        try:
+            categories = sorted(os.listdir(self.base_dir))
+        except FileNotFoundError:
+            return
+        for category in categories:
+            d = os.path.join(self.base_dir, category)
+            if not os.path.isdir(d):
+                continue
+            for name in sorted(os.listdir(d)):
+                if name.endswith((self._META_SUFFIX, ".tmp")):
+                    continue
+                entry = self.get(category, name)
+                if entry is not None:
+                    yield category, name, entry
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """All entries in one SQLite file in WAL mode.
+
+    WAL lets several uvicorn workers read while one writes. Writes are
+    buffered and committed in batches of ``batch_size`` or after
+    ``flush_sec``; reads see the pending buffer of this process. Timed
+    flushes run on one long-lived thread, so they reuse its connection.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            category TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data BLOB NOT NULL,
+            stored_at REAL NOT NULL,
+            expires_at REAL,
+            encoding TEXT NOT NULL DEFAULT '',
+            etag TEXT,
+            last_modified TEXT,
+            PRIMARY KEY (category, key)
+        ) WITHOUT ROWID
+    """
+
+    def __init__(
+        self,
+        path: str = CACHE_SQLITE_PATH,
+        batch_size: int = CACHE_SQLITE_BATCH,
+        flush_sec: float = CACHE_SQLITE_FLUSH_SEC,
+    ):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_sec = flush_sec
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._pending: Dict[Tuple[str, str], CacheEntry] = {}
+        # monotonic time by which the pending buffer must reach disk
+        self._deadline: Optional[float] = None
+        self._flusher: Optional[threading.Thread] = None
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(self._SCHEMA)
+        self._migrate(conn)
+        conn.commit()
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        cols = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+        if "encoding" not in cols:
+            conn.execute(
+                "ALTER TABLE cache ADD COLUMN encoding TEXT NOT NULL DEFAULT ''"
+            )
+        for col in ("etag", "last_modified"):
+            if col not in cols:
+                conn.execute(f"ALTER TABLE cache ADD COLUMN {col} TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, category: str, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            pending = self._pending.get((category, key))
+        if pending is not None:
+            return pending
+        try:
+            row = (
+                self._conn()
+                .execute(
+                    "SELECT data, stored_at, expires_at, encoding, etag,"
+                    " last_modified FROM cache"
+                    " WHERE category = ? AND key = ?",
+                    (category, key),
+                )
+                .fetchone()
+            )
+        except sqlite3.Error:
+            return None
+        return CacheEntry(bytes(row[0]), *row[1:]) if row else None
+
+    def set(self, category: str, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._pending[(category, key)] = entry
+            now = time.monotonic()
+            # A full batch is due now, a lone write after flush_sec. Either
+            # way the commit (up to a 30 s busy wait) happens on the flush
+            # thread, never on the caller's thread or the event loop.
+            if len(self._pending) >= self.batch_size:
+                deadline = now
+            else:
+                deadline = now + self.flush_sec
+            if self._deadline is None or deadline < self._deadline:
+                self._deadline = deadline
+                if self._flusher is None:
+                    self._flusher = threading.Thread(
+                        target=self._flush_loop, name="cache-flush", daemon=True
+                    )
+                    self._flusher.start()
+                self._wake.notify()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._wake:
+                while self._deadline is None:
+                    self._wake.wait()
+                delay = self._deadline - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    continue
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            self._deadline = None
+        if not batch:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache"
+                " (category, key, data, stored_at, expires_at, encoding, etag,"
+                " last_modified) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        cat,
+                        key,
+                        e.data,
+                        e.stored_at,
+                        e.expires_at,
+                        e.encoding,
+                        e.etag,
+                        e.last_modified,
+                    )
+                    for (cat, key), e in batch.items()
+                ],
+            )
+
+
+_BACKEND: Optional[CacheBackend] = None
+_BACKEND_LOCK = threading.Lock()
+
+
+def _make_backend() -> CacheBackend:
+    if CACHE_BACKEND == "sqlite":
+        if not os.path.exists(CACHE_SQLITE_PATH) and _has_file_entries(CACHE_DIR):
+            log.warning(
+                "CACHE_BACKEND=sqlite starts empty; the file cache in %s is not"
+                " used. Import it with: python -m app.core.cache import-files",
+                CACHE_DIR,
+            )
+        return SQLiteCacheBackend()
+    return FileCacheBackend()
+
+
+def _has_file_entries(base_dir: str) -> bool:
+    return next(FileCacheBackend(base_dir).iter_entries(), None) is not None
+
+
+def import_file_cache(base_dir: str, backend: CacheBackend) -> int:
+    """Copy the entries of a file cache into ``backend``; returns the count.
+
+    Keys are taken from the file names, which the file backend sanitizes:
+    keys with characters other than letters, digits, ``_``, ``.`` and ``-``
+    are imported under their sanitized name and will simply miss.
+    """
+    n = 0
+    for category, key, entry in FileCacheBackend(base_dir).iter_entries():
+        backend.set(category, key, entry)
+        n += 1
+    backend.flush()
+    return n
+
+
+def get_backend() -> CacheBackend:
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is None:
+            _BACKEND = _make_backend()
+        return _BACKEND
+
+
+def set_backend(backend: CacheBackend) -> None:
+    global _BACKEND
+    with _BACKEND_LOCK:
+        if _BACKEND is not None:
+            _BACKEND.flush()
+        _BACKEND = backend
+
+
+@atexit.register
+def _flush_backend() -> None:
+    if _BACKEND is not None:
+        try:
+            _BACKEND.flush()
+        except Exception:
+            pass
+
+
+def _expires_at(ttl: Optional[float], now: float) -> Optional[float]:
+    return None if ttl is None else now + ttl
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _encode(data: bytes) -> Tuple[bytes, str]:
+    if CACHE_COMPRESS_LEVEL > 0:
+        packed = zlib.compress(data, CACHE_COMPRESS_LEVEL)
+        # already compressed payloads (WOFF) are stored as they are, marked
+        # so that they are not tried again on every hit
+        if len(packed) < len(data):
+            return packed, "zlib"
+        return data, "raw"
+    return data, ""
+
+
+def _decode(entry: CacheEntry) -> bytes:
+    if entry.encoding == "zlib":
+        return zlib.decompress(entry.data)
+    return entry.data
+
+
+@dataclass
+class CacheHit:
+    """A cached value, possibly expired, with its upstream validators."""
+
+    value: Union[str, bytes]
+    fresh: bool
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: Optional[float] = None  # None = never expires
+
+    def validators(self) -> Dict[str, Optional[str]]:
+        return {"etag": self.etag, "last_modified": self.last_modified}
+
+
+@staged("cache")
+def cache_lookup(
+    category: str, key: str, suffix: str = "", binary: bool = False
+) -> Optional[CacheHit]:
+    """Like ``cache_read`` but also returns expired entries for revalidation."""
+    name = key + suffix
+    try:
+        backend = get_backend()
+        entry = backend.get(category, name)
+        if entry is None:
+            CACHE_LOOKUPS.inc(category=category, result="miss")
+            return None
+        data = _decode(entry)
+        if not entry.encoding and CACHE_COMPRESS_LEVEL > 0:
+            # migrate entries written before compression on first hit; "raw"
+            # is recorded too, so each entry is only tried once
+            packed, encoding = _encode(data)
+            backend.set(category, name, replace(entry, data=packed, encoding=encoding))
+    except Exception:
+        CACHE_LOOKUPS.inc(category=category, result="miss")
+        return None
+    fresh = entry.is_fresh()
+    CACHE_LOOKUPS.inc(category=category, result="hit" if fresh else "stale")
+    return CacheHit(
+        data if binary else data.decode("utf-8"),
+        fresh,
+        entry.etag,
+        entry.last_modified,
+        entry.expires_at,
+    )
+
+
+def cache_read(
+    category: str, key: str, suffix: str = "", binary: bool = False
+) -> Optional[Union[str, bytes]]:
+    hit = cache_lookup(category, key, suffix, binary)
+    if hit is None or not hit.fresh:
+        return None
+    return hit.value
+
+
+@staged("cache")
+def cache_write(
+    category: str,
+    key: str,
+    value: Union[str, bytes],
+    ttl: Optional[float],
+    suffix: str = "",
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> None:
+    """Store ``value``; ``ttl`` is in seconds, ``None`` never expires."""
+    now = time.time()
+    data = value.encode("utf-8") if isinstance(value, str) else value
+    try:
+        packed, encoding = _encode(data)
+        get_backend().set(
+            category,
+            key + suffix,
+            CacheEntry(
+                packed, now, _expires_at(ttl, now), encoding, etag, last_modified
+            ),
+        )
+        CACHE_WRITES.inc(category=category)
+    except Exception:
+        pass
+
+
+def cache_refresh(
+    category: str, key: str, ttl: Optional[float], suffix: str = ""
+) -> None:
+    """Restart the TTL of an entry upstream confirmed as unchanged (304)."""
+    now = time.time()
+    try:
+        backend = get_backend()
+        entry = backend.get(category, key + suffix)
+        if entry is not None:
+            backend.set(
+                category,
+                key + suffix,
+                replace(entry, stored_at=now, expires_at=_expires_at(ttl, now)),
+            )
+    except Exception:
+        pass
+
+
+# TTL policy
+
+
+def _parse_date(s: Optional[str]) -> Optional[date]:
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime((s or "").strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _is_settled(d: Optional[date]) -> bool:
+    # Scores and cancellations trickle in for a while after match day
+    return d is not None and d < date.today() - timedelta(days=CACHE_SETTLE_DAYS)
+
+
+def calendar_ttl(date_from: str, date_to: str) -> Optional[float]:
+    """Windows that lie entirely in the settled past no longer change."""
+    if _is_settled(_parse_date(date_to)):
+        return CACHE_TTL_FINAL
+    return CACHE_TTL_LIVE
+
+
+def match_ttl(date_label: Optional[str], score: Optional[str]) -> Optional[float]:
+    """A match page is final once the match is over and has a score."""
+    d = _parse_date(date_label)
+    if score and d is not None and d < date.today():
+        return CACHE_TTL_FINAL
+    return CACHE_TTL_LIVE
+
+
+# Obfuscation CSS/fonts are addressed by their id and never change
+OBFUSCATION_TTL: Optional[float] = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="cache maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import-files", help="copy a file cache into the SQLite cache")
+    imp.add_argument("--from", dest="src", default=CACHE_DIR)
+    imp.add_argument("--to", dest="dest", default=CACHE_SQLITE_PATH)
+    args = parser.parse_args()
+    n = import_file_cache(args.src, SQLiteCacheBackend(args.dest))
+    print(f"imported {n} entries from {args.src} into {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
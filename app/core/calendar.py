@@ -1,12 +1,96 @@
+import asyncio
+import json
 import re
-import time
-from typing import Dict, List, Optional
-from bs4 import BeautifulSoup
-from ..config import BASE, REQUEST_TIMEOUT, SLEEP_SEC, USE_CACHE_DEFAULT
-from .http import get_text, temp_headers
-from .utils import cache_path_for, game_id_REGEX, STAFFEL_ID_REGEX
-from .postal import _resolve_plz_inputs
+from datetime import date, datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from ..config import (
+    BASE,
+    REQUEST_TIMEOUT,
+    USE_CACHE_DEFAULT,
+    CALENDAR_CONCURRENCY,
+    CALENDAR_WINDOW,
+)
+from .http import Fetched, get_text_validated, aget_text_validated
+from .utils import make_soup, game_id_REGEX, STAFFEL_ID_REGEX
+from .cache import CacheHit, cache_lookup, cache_refresh, cache_write, calendar_ttl
+from .postal import _resolve_plz_inputs, _aresolve_plz_inputs
 from .match import _normalize_date_time_fields
+from .metrics import CALENDAR_PAGES, PARSE_SECONDS
+from .timing import staged
+
+
+def _calendar_url(
+    plz: str, date_from: str, date_to: str, offset: int, max_results: int
+) -> str:
+    return (
+        f"{BASE}/ajax.match.calendar.loadmore/-/datum-bis/{date_to}"
+        f"/datum-von/{date_from}/mime-type/JSON/plz/{plz}"
+        f"/max/{max_results}/offset/{offset}"
+    )
+
+
+def _calendar_headers(plz: str, date_from: str, date_to: str) -> Dict[str, str]:
+    referer = (
+        f"{BASE}/matchkalender/-/plz/{plz}/datum-von/{date_from}"
+        f"/datum-bis/{date_to}/wettkampftyp/-1/mannschaftsart/-1"
+    )
+    return {"accept": "application/json, text/plain, */*", "referer": referer}
+
+
+def _calendar_cache_key(
+    plz: str, date_from: str, date_to: str, offset: int, max_results: int
+) -> str:
+    return f"{plz}_{date_from}_{date_to}_{offset}_{max_results}.json"
+
+
+def _loads_or_none(raw: Optional[str]) -> Optional[Dict]:
+    if raw is None:
+        return None
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return None
+
+
+def _lookup_calendar_cache(key: str, use_cache: bool) -> Optional[CacheHit]:
+    return cache_lookup("calendar", key, suffix=".json") if use_cache else None
+
+
+def _write_calendar_cache(
+    key: str, data: Dict, date_from: str, date_to: str, fetched: Fetched
+) -> None:
+    cache_write(
+        "calendar",
+        key,
+        json.dumps(data, ensure_ascii=False),
+        ttl=calendar_ttl(date_from, date_to),
+        suffix=".json",
+        etag=fetched.etag,
+        last_modified=fetched.last_modified,
+    )
+
+
+def _calendar_page_from(
+    fetched: Fetched,
+    hit: Optional[CacheHit],
+    key: str,
+    date_from: str,
+    date_to: str,
+    offset: int,
+    use_cache: bool,
+) -> Dict:
+    if fetched.not_modified and hit is not None:
+        stale = _loads_or_none(hit.value)
+        if stale is not None:
+            cache_refresh("calendar", key, calendar_ttl(date_from, date_to), ".json")
+            return stale
+    if not fetched.body:
+        return {"html": "", "final": True, "lastIndex": offset}
+
+    data = json.loads(fetched.body)
+    if use_cache:
+        _write_calendar_cache(key, data, date_from, date_to, fetched)
+    return data
 
 
 def fetch_calendar_page(
@@ -17,113 +101,150 @@ def fetch_calendar_page(
     max_results: int,
     use_cache: bool = USE_CACHE_DEFAULT,
 ) -> Dict:
-    url = (
-        f"{BASE}/ajax.match.calendar.loadmore/-/datum-bis/{date_to}"
-        f"/datum-von/{date_from}/mime-type/JSON/plz/{plz}"
-        f"/max/{max_results}/offset/{offset}"
+    cache_key = _calendar_cache_key(plz, date_from, date_to, offset, max_results)
+    hit = _lookup_calendar_cache(cache_key, use_cache)
+    if hit is not None and hit.fresh:
+        cached = _loads_or_none(hit.value)
+        if cached is not None:
+            return cached
+
+    # an expired entry is revalidated; 304 keeps it for another TTL
+    fetched = get_text_validated(
+        _calendar_url(plz, date_from, date_to, offset, max_results),
+        timeout=REQUEST_TIMEOUT,
+        headers=_calendar_headers(plz, date_from, date_to),
+        **(hit.validators() if hit else {}),
     )
-    cache_file = (
-        cache_path_for(
-            "calendar", f"{plz}_{date_from}_{date_to}_{offset}_{max_results}.json"
-        )
-        + ".json"
+    return _calendar_page_from(
+        fetched, hit, cache_key, date_from, date_to, offset, use_cache
     )
 
-    if use_cache:
-        try:
-            import json
-            import os
 
-            if os.path.exists(cache_file):
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception:
-            pass
+async def afetch_calendar_page(
+    plz: str,
+    date_from: str,
+    date_to: str,
+    offset: int,
+    max_results: int,
+    use_cache: bool = USE_CACHE_DEFAULT,
+) -> Dict:
+    cache_key = _calendar_cache_key(plz, date_from, date_to, offset, max_results)
+    # cache reads/writes are file/SQLite I/O plus zlib; keep them off the loop
+    hit = await asyncio.to_thread(_lookup_calendar_cache, cache_key, use_cache)
+    if hit is not None and hit.fresh:
+        cached = _loads_or_none(hit.value)
+        if cached is not None:
+            return cached
 
-    referer = (
-        f"{BASE}/matchkalender/-/plz/{plz}/datum-von/{date_from}"
-        f"/datum-bis/{date_to}/wettkampftyp/-1/mannschaftsart/-1"
+    fetched = await aget_text_validated(
+        _calendar_url(plz, date_from, date_to, offset, max_results),
+        timeout=REQUEST_TIMEOUT,
+        headers=_calendar_headers(plz, date_from, date_to),
+        **(hit.validators() if hit else {}),
+    )
+    return await asyncio.to_thread(
+        _calendar_page_from,
+        fetched,
+        hit,
+        cache_key,
+        date_from,
+        date_to,
+        offset,
+        use_cache,
     )
 
-    with temp_headers(accept="application/json, text/plain, */*", referer=referer):
-        text = get_text(url, timeout=REQUEST_TIMEOUT)
-    if not text:
-        return {"html": "", "final": True, "lastIndex": offset}
 
-    import json
+_SCORE_RX = re.compile(r"(\d+)\s*:\s*(\d+)")
 
-    data = json.loads(text)
-    if use_cache:
-        try:
-            import os
 
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False)
-        except Exception:
-            pass
-    return data
+def _link_and_ids_from_hrefs(hrefs: List[str]) -> Dict[str, Optional[str]]:
+    # A match link wins over a staffel link, whatever the order in the row
+    for h in hrefs:
+        m = game_id_REGEX.search(h)
+        if m:
+            return {"href": h, "game_id": m.group(1), "staffel_id": None}
+    for h in hrefs:
+        g = STAFFEL_ID_REGEX.search(h)
+        if g:
+            return {"href": h, "game_id": None, "staffel_id": g.group(1)}
+    return {"href": "", "game_id": None, "staffel_id": None}
 
 
 def _extract_link_and_ids(row) -> Dict[str, Optional[str]]:
-    game_id = None
-    staffel_id = None
-    href = ""
-    for a in row.find_all("a", href=True):
-        h = a["href"]
-        m = game_id_REGEX.search(h)
-        if m:
-            game_id = m.group(1)
-            href = h
-            break
-    if not game_id:
-        for a in row.find_all("a", href=True):
-            h = a["href"]
-            g = STAFFEL_ID_REGEX.search(h)
-            if g:
-                staffel_id = g.group(1)
-                href = h
-                break
-    return {"href": href, "game_id": game_id, "staffel_id": staffel_id}
+    return _link_and_ids_from_hrefs([a["href"] for a in row.find_all("a", href=True)])
+
+
+def _scan_row(row) -> Tuple[List, List, Optional[object], List[str]]:
+    # One walk over the row collects every cell and link parse_matches needs
+    tds: List = []
+    clubs: List = []
+    score_cell = None
+    hrefs: List[str] = []
+    for el in row.descendants:
+        name = el.name
+        if name == "td":
+            tds.append(el)
+            classes = el.get("class") or ()
+            if "column-club" in classes:
+                clubs.append(el)
+            elif score_cell is None and "column-score" in classes:
+                score_cell = el
+        elif name == "a":
+            h = el.get("href")
+            if h is not None:
+                hrefs.append(h)
+    return tds, clubs, score_cell, hrefs
+
 
+def _cell_text(cells: List, i: int) -> str:
+    return cells[i].get_text(" ", strip=True) if len(cells) > i else ""
 
-def parse_matches(html: str) -> List[Dict]:
-    soup = BeautifulSoup(html or "", "html.parser")
+
+@staged("parse")
+@PARSE_SECONDS.timed(stage="calendar")
+def parse_matches(html: str, known: Optional[Dict[str, Dict]] = None) -> List[Dict]:
+    """Parse one calendar HTML fragment into match dicts.
+
+    ``known`` maps game_id -> already parsed match. Rows whose game_id is in
+    there are not parsed again; the known dict object is returned instead and
+    newly parsed matches are registered in it.
+    """
+    soup = make_soup(html)
     matches: List[Dict] = []
     current_date_text: Optional[str] = None
 
     for row in soup.find_all("tr"):
-        classes = row.get("class") or []
+        classes = row.get("class") or ()
         if "row-headline" in classes:
             current_date_text = row.get_text(" ", strip=True)
             continue
 
-        tds = row.find_all("td")
+        tds, clubs, score_cell, hrefs = _scan_row(row)
         if not tds:
             continue
 
-        time_txt = tds[0].get_text(" ", strip=True) if len(tds) > 0 else ""
-        age_group = tds[1].get_text(" ", strip=True) if len(tds) > 1 else ""
-        league = tds[2].get_text(" ", strip=True) if len(tds) > 2 else ""
+        linkbits = _link_and_ids_from_hrefs(hrefs)
+        href = linkbits["href"]
+        game_id = linkbits["game_id"]
+        if known is not None and game_id and game_id in known:
+            matches.append(known[game_id])
+            continue
 
-        clubs = row.find_all("td", class_="column-club")
-        home_team = clubs[0].get_text(" ", strip=True) if len(clubs) > 0 else ""
-        away_team = clubs[1].get_text(" ", strip=True) if len(clubs) > 1 else ""
+        home_team = _cell_text(clubs, 0)
+        away_team = _cell_text(clubs, 1)
+        if not (home_team or away_team or game_id):
+            # venue/info rows
+            continue
 
-        score_cell = row.find("td", class_="column-score")
         score_txt = score_cell.get_text(" ", strip=True) if score_cell else ""
-        m_score = re.search(r"(\d+)\s*:\s*(\d+)", score_txt)
+        m_score = _SCORE_RX.search(score_txt)
         score_clean = f"{m_score.group(1)}:{m_score.group(2)}" if m_score else None
 
-        linkbits = _extract_link_and_ids(row)
-        href = linkbits["href"]
-        game_id = linkbits["game_id"]
-
         detail = {
             "date_label": current_date_text,
-            "time": time_txt,
-            "age_group": age_group,
-            "league": league,
+            "time": _cell_text(tds, 0),
+            "age_group": _cell_text(tds, 1),
+            "league": _cell_text(tds, 2),
             "home": home_team,
             "away": away_team,
             "score": score_clean,
@@ -132,51 +253,280 @@ def parse_matches(html: str) -> List[Dict]:
         }
         detail = _normalize_date_time_fields(detail)
 
-        if home_team or away_team or game_id:
-            matches.append(detail)
+        if known is not None and game_id:
+            # setdefault: a concurrent parse of the same game wins once
+            detail = known.setdefault(game_id, detail)
+        matches.append(detail)
 
     return matches
 
 
+def _dedup_key(m: Dict) -> Tuple:
+    if m.get("game_id"):
+        return ("id", m["game_id"])
+    return ("row", m.get("date_label"), m.get("time"), m.get("home"), m.get("away"))
+
+
+def _merge_area_matches(per_plz: Iterable[Tuple[str, Iterable[Dict]]]) -> List[Dict]:
+    # First occurrence wins (PLZ order, then page order); every PLZ a match
+    # was listed under is recorded in "plzs".
+    by_key: Dict[Tuple, Dict] = {}
+    for plz, matches in per_plz:
+        for m in matches:
+            key = _dedup_key(m)
+            first = by_key.get(key)
+            if first is None:
+                first = by_key[key] = m
+                first["plzs"] = []
+            if plz not in first["plzs"]:
+                first["plzs"].append(plz)
+    return list(by_key.values())
+
+
+def _next_offset(data: Dict, last_seen_lastindex: int) -> Optional[int]:
+    # The loadmore protocol only tells us the next offset once a page is in,
+    # so pages of one PLZ are inherently sequential.
+    last_index = data.get("lastIndex", 0)
+    if data.get("final") or last_index == last_seen_lastindex:
+        return None
+    return last_index + 1
+
+
+def _parse_day(s: Optional[str], fmt: str) -> Optional[date]:
+    try:
+        return datetime.strptime((s or "").strip(), fmt).date()
+    except ValueError:
+        return None
+
+
+def calendar_windows(
+    date_from: str, date_to: str, granularity: str = CALENDAR_WINDOW
+) -> List[Tuple[str, str]]:
+    """Split a range into aligned day or ISO-week windows covering it.
+
+    Windows are never clipped to the range, so overlapping queries map to
+    the same cache keys; callers filter rows back to the range. "auto"
+    uses a day window for single-day ranges, so a cold one-day query does
+    not fetch a whole week, and weeks otherwise. Anything else ("off",
+    unparsable dates) keeps the exact range.
+    """
+    d0 = _parse_day(date_from, "%Y-%m-%d")
+    d1 = _parse_day(date_to, "%Y-%m-%d")
+    if granularity == "auto":
+        granularity = "day" if d0 is not None and d0 == d1 else "week"
+    if granularity not in ("day", "week") or d0 is None or d1 is None or d1 < d0:
+        return [(date_from, date_to)]
+    step = timedelta(days=7 if granularity == "week" else 1)
+    start = d0 - timedelta(days=d0.weekday()) if granularity == "week" else d0
+    windows = []
+    while start <= d1:
+        end = start + step - timedelta(days=1)
+        windows.append((start.isoformat(), end.isoformat()))
+        start = end + timedelta(days=1)
+    return windows
+
+
+def _in_range(m: Dict, d0: Optional[date], d1: Optional[date]) -> bool:
+    # Rows without a readable date are kept rather than silently dropped
+    d = _parse_day(m.get("date_label"), "%d.%m.%Y")
+    if d is None or d0 is None or d1 is None:
+        return True
+    return d0 <= d <= d1
+
+
+def _window_jobs(
+    plzs: List[str], date_from: str, date_to: str
+) -> List[Tuple[str, str, str]]:
+    windows = calendar_windows(date_from, date_to)
+    return [(plz, wf, wt) for plz in plzs for wf, wt in windows]
+
+
 def iter_matches_for_plz(
     plz: str,
     date_from: str,
     date_to: str,
     page_size: int = 50,
-    sleep_sec: float = SLEEP_SEC,
     use_cache: bool = USE_CACHE_DEFAULT,
+    known: Optional[Dict[str, Dict]] = None,
 ):
     offset = 0
     last_seen_lastindex = -1
-    while True:
-        data = fetch_calendar_page(
-            plz, date_from, date_to, offset, page_size, use_cache=use_cache
-        )
-        html = data.get("html") or ""
-        if not html.strip():
-            break
+    pages = 0
+    try:
+        while True:
+            data = fetch_calendar_page(
+                plz, date_from, date_to, offset, page_size, use_cache=use_cache
+            )
+            pages += 1
+            html = data.get("html") or ""
+            if not html.strip():
+                break
 
-        matches = parse_matches(html)
-        for m in matches:
-            yield m
+            matches = parse_matches(html, known)
+            for m in matches:
+                yield m
 
-        final = data.get("final")
-        last_index = data.get("lastIndex", 0)
-        if final or last_index == last_seen_lastindex:
-            break
-        last_seen_lastindex = last_index
-        offset = last_index + 1
-        time.sleep(sleep_sec)
+            next_offset = _next_offset(data, last_seen_lastindex)
+            if next_offset is None:
+                break
+            last_seen_lastindex = data.get("lastIndex", 0)
+            offset = next_offset
+    finally:
+        CALENDAR_PAGES.observe(pages)
+
+
+async def aiter_matches_for_plz(
+    plz: str,
+    date_from: str,
+    date_to: str,
+    page_size: int = 50,
+    use_cache: bool = USE_CACHE_DEFAULT,
+    known: Optional[Dict[str, Dict]] = None,
+) -> AsyncIterator[Dict]:
+    offset = 0
+    last_seen_lastindex = -1
+    pages = 0
+    try:
+        while True:
+            data = await afetch_calendar_page(
+                plz, date_from, date_to, offset, page_size, use_cache=use_cache
+            )
+            pages += 1
+            html = data.get("html") or ""
+            if not html.strip():
+                break
+
+            # BeautifulSoup is CPU-bound; keep the event loop responsive
+            matches = await asyncio.to_thread(parse_matches, html, known)
+            for m in matches:
+                yield m
+
+            next_offset = _next_offset(data, last_seen_lastindex)
+            if next_offset is None:
+                break
+            last_seen_lastindex = data.get("lastIndex", 0)
+            offset = next_offset
+    finally:
+        CALENDAR_PAGES.observe(pages)
 
 
 def collect_matches_for_area(
     date_from: str, date_to: str, plz_query: str, use_cache: bool = USE_CACHE_DEFAULT
 ) -> List[Dict]:
     plzs = _resolve_plz_inputs(plz_query)
-    all_matches: List[Dict] = []
-    for plz in plzs:
-        for m in iter_matches_for_plz(
-            plz, date_from, date_to, page_size=50, use_cache=use_cache
-        ):
-            all_matches.append(m)
-    return all_matches
+    d0 = _parse_day(date_from, "%Y-%m-%d")
+    d1 = _parse_day(date_to, "%Y-%m-%d")
+    known: Dict[str, Dict] = {}
+    return _merge_area_matches(
+        (
+            plz,
+            [
+                m
+                for m in iter_matches_for_plz(
+                    plz, wf, wt, page_size=50, use_cache=use_cache, known=known
+                )
+                if _in_range(m, d0, d1)
+            ],
+        )
+        for plz, wf, wt in _window_jobs(plzs, date_from, date_to)
+    )
+
+
+async def acollect_matches_for_area(
+    date_from: str,
+    date_to: str,
+    plz_query: str,
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = CALENDAR_CONCURRENCY,
+) -> List[Dict]:
+    plzs = await _aresolve_plz_inputs(plz_query)
+    return await acollect_matches_for_plzs(
+        date_from, date_to, plzs, use_cache=use_cache, concurrency=concurrency
+    )
+
+
+async def acollect_matches_for_plzs(
+    date_from: str,
+    date_to: str,
+    plzs: List[str],
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = CALENDAR_CONCURRENCY,
+) -> List[Dict]:
+    d0 = _parse_day(date_from, "%Y-%m-%d")
+    d1 = _parse_day(date_to, "%Y-%m-%d")
+    sem = asyncio.Semaphore(max(1, concurrency))
+    known: Dict[str, Dict] = {}
+    jobs = _window_jobs(plzs, date_from, date_to)
+
+    async def _one(plz: str, wf: str, wt: str) -> List[Dict]:
+        async with sem:
+            return [
+                m
+                async for m in aiter_matches_for_plz(
+                    plz, wf, wt, page_size=50, use_cache=use_cache, known=known
+                )
+                if _in_range(m, d0, d1)
+            ]
+
+    # gather keeps PLZ and window order, so the merge is deterministic
+    per_job = await asyncio.gather(*(_one(*job) for job in jobs))
+    return _merge_area_matches(
+        (plz, matches) for (plz, _, _), matches in zip(jobs, per_job)
+    )
+
+
+async def astream_matches_for_area(
+    date_from: str,
+    date_to: str,
+    plzs: List[str],
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = CALENDAR_CONCURRENCY,
+) -> AsyncIterator[Dict]:
+    """Yield area matches as soon as their calendar page is parsed.
+
+    ``plzs`` are resolved by the caller, so a bad area fails before a
+    streamed response has started. Duplicates are dropped on first sight,
+    so unlike the collecting variant the order follows upstream arrival and
+    ``plzs`` is not filled in. Only the dedup keys are kept, not the rows.
+    """
+    d0 = _parse_day(date_from, "%Y-%m-%d")
+    d1 = _parse_day(date_to, "%Y-%m-%d")
+    sem = asyncio.Semaphore(max(1, concurrency))
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency) * 50)
+    done = object()
+
+    async def _produce(plz: str, wf: str, wt: str) -> None:
+        try:
+            async with sem:
+                async for m in aiter_matches_for_plz(
+                    plz, wf, wt, page_size=50, use_cache=use_cache
+                ):
+                    if _in_range(m, d0, d1):
+                        await queue.put(m)
+        except Exception as e:  # surfaced to the consumer below
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    tasks = [
+        asyncio.create_task(_produce(*job))
+        for job in _window_jobs(plzs, date_from, date_to)
+    ]
+    seen = set()
+    pending = len(tasks)
+    try:
+        while pending:
+            item = await queue.get()
+            if item is done:
+                pending -= 1
+                continue
+            if isinstance(item, Exception):
+                raise item
+            key = _dedup_key(item)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield item
+    finally:
+        for t in tasks:
+            t.cancel()
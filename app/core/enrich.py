@@ -0,0 +1,132 @@
+import asyncio
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Set
+from ..config import (
+    ENRICH_CONCURRENCY,
+    ENRICH_RATE_SHARE,
+    RATE_LIMIT_RPS,
+    USE_CACHE_DEFAULT,
+)
+from .match import fetch_match_full, read_cached_match_full
+from .ratelimit import TokenBucket
+from .timing import stage
+
+
+def _enrich_rate(
+    rps: float = RATE_LIMIT_RPS, share: float = ENRICH_RATE_SHARE
+) -> float:
+    """Rate of the enrichment bucket; 0 leaves only the per-host limiter."""
+    if rps <= 0 or not 0 < share < 1:
+        return 0
+    return rps * share
+
+
+# Uncached detail fetches pass this bucket and then the per-host limiter.
+# Being a fraction of RATE_LIMIT_RPS, it keeps the remaining share of the
+# upstream budget for calendar pages while an enrichment is running.
+_ENRICH_BUCKET = TokenBucket(_enrich_rate(), ENRICH_CONCURRENCY)
+
+
+def _merge_detail(row: Dict, detail: Optional[Dict]) -> Dict:
+    """Overlay a calendar row onto its details; the row wins where it has data."""
+    if not detail:
+        return row
+    merged = dict(detail)
+    merged.update({k: v for k, v in row.items() if v is not None})
+    return merged
+
+
+async def _acached_detail(row: Dict, use_cache: bool) -> Optional[Dict]:
+    if not use_cache or not row.get("link"):
+        return None
+    # a cache read is file/SQLite I/O; keep it off the event loop
+    return await asyncio.to_thread(read_cached_match_full, row["link"])
+
+
+async def _aenrich_one(row: Dict, use_cache: bool) -> Dict:
+    with stage("ratelimit"):
+        await _ENRICH_BUCKET.aacquire()
+    try:
+        detail = await asyncio.to_thread(fetch_match_full, row["link"], use_cache)
+    except Exception:
+        # enrichment is best effort, the overview row is still valid
+        detail = None
+    return _merge_detail(row, detail)
+
+
+async def aenrich_matches(
+    rows: AsyncIterable[Dict],
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = ENRICH_CONCURRENCY,
+) -> AsyncIterator[Dict]:
+    """Hydrate calendar rows with ``fetch_match_full`` fields as they arrive.
+
+    Rows whose details are already in the parsed cache are yielded right
+    away; the rest are fetched by a bounded pool and yielded in completion
+    order. Rows without a link pass through unchanged. At most
+    ``concurrency`` fetches exist at a time; the input is not read ahead of
+    them.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, concurrency))
+    done = object()
+    tasks: Set[asyncio.Task] = set()
+
+    async def _put_enriched(row: Dict) -> None:
+        try:
+            await queue.put(await _aenrich_one(row, use_cache))
+        finally:
+            sem.release()
+
+    async def _produce() -> None:
+        try:
+            async for row in rows:
+                cached = await _acached_detail(row, use_cache)
+                if cached or not row.get("link"):
+                    await queue.put(_merge_detail(row, cached))
+                    continue
+                # a slot is taken before the task exists, so a long input
+                # waits here instead of piling up pending tasks
+                await sem.acquire()
+                task = asyncio.create_task(_put_enriched(row))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except Exception as e:  # surfaced to the consumer below
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    producer = asyncio.create_task(_produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
+        for t in list(tasks):
+            t.cancel()
+
+
+async def aenrich_match_list(
+    rows: Iterable[Dict],
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = ENRICH_CONCURRENCY,
+) -> List[Dict]:
+    """Like ``aenrich_matches`` but returns the rows in their input order."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(row: Dict) -> Dict:
+        if not row.get("link"):
+            return row
+        async with sem:
+            cached = await _acached_detail(row, use_cache)
+            if cached:
+                return _merge_detail(row, cached)
+            return await _aenrich_one(row, use_cache)
+
+    return list(await asyncio.gather(*(_one(r) for r in rows)))
@@ -1,46 +1,343 @@
-from contextlib import contextmanager
-from typing import Optional, Any
+import asyncio
+import copy
+from dataclasses import dataclass
+from typing import Optional, Any, Dict, Hashable, Set, Union
+import httpx
 import requests
-from ..config import USER_AGENT, REQUEST_TIMEOUT
+from ..config import (
+    USER_AGENT,
+    REQUEST_TIMEOUT,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE,
+    HTTP_SINGLE_FLIGHT,
+)
+from .ratelimit import acquire, aacquire
+from .singleflight import SingleFlight, AsyncSingleFlight
+from .timing import stage
+from .metrics import (
+    UPSTREAM_COALESCED,
+    UPSTREAM_REQUESTS,
+    UPSTREAM_SECONDS,
+    upstream_kind,
+)
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    "accept": "application/json, text/plain, */*",
+    "user-agent": USER_AGENT,
+    "x-requested-with": "XMLHttpRequest",
+}
 
 SESSION = requests.Session()
-SESSION.headers.update(
-    {
-        "accept": "application/json, text/plain, */*",
-        "user-agent": USER_AGENT,
-        "x-requested-with": "XMLHttpRequest",
-    }
-)
+SESSION.headers.update(DEFAULT_HEADERS)
+
+
+@dataclass(frozen=True)
+class Fetched:
+    """Result of a conditional GET; ``body`` is None on 304 or failure."""
+
+    body: Optional[Union[str, bytes]]
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = False
+
 
+# Identical concurrent GETs share one upstream request (sync and async
+# callers are coalesced separately).
+_FLIGHTS = SingleFlight()
+_AFLIGHTS = AsyncSingleFlight()
 
-@contextmanager
-def temp_headers(**headers: str):
-    backup = dict(SESSION.headers)
+# One pooled async client per event loop (uvicorn runs one loop per worker).
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+_ASYNC_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _merge_headers(headers: Optional[Dict[str, Optional[str]]]) -> Dict[str, str]:
+    # A None value deletes a default header (like requests does per request)
+    merged = dict(DEFAULT_HEADERS)
+    for k, v in (headers or {}).items():
+        if v is None:
+            merged.pop(k, None)
+        else:
+            merged[k] = v
+    return merged
+
+
+def _flight_key(
+    kind: str,
+    url: str,
+    headers: Optional[Dict[str, Optional[str]]],
+    allow_redirects: bool = True,
+) -> Hashable:
+    # Everything that can change the upstream response, but not the timeout
+    merged = _merge_headers(headers)
+    return (kind, url, allow_redirects, tuple(sorted(merged.items())))
+
+
+def _send(url: str, **kwargs):
+    with stage("ratelimit"):
+        acquire(url)
+    kind = upstream_kind(url)
     try:
-        # Remove keys with None to allow deletion
-        for k, v in headers.items():
-            if v is None and k in SESSION.headers:
-                del SESSION.headers[k]
-        # Add/override the rest
-        for k, v in headers.items():
-            if v is not None:
-                SESSION.headers[k] = v
-        yield
-    finally:
-        SESSION.headers.clear()
-        SESSION.headers.update(backup)
-
-
-def get_json(url: str, *, timeout: float = REQUEST_TIMEOUT) -> Any:
-    r = SESSION.get(url, timeout=timeout)
-    r.raise_for_status()
-    return r.json()
+        with UPSTREAM_SECONDS.time(kind=kind):
+            r = SESSION.get(url, **kwargs)
+    except Exception:
+        UPSTREAM_REQUESTS.inc(kind=kind, status="error")
+        raise
+    UPSTREAM_REQUESTS.inc(kind=kind, status=str(r.status_code))
+    return r
+
+
+async def _asend(url: str, **kwargs):
+    with stage("ratelimit"):
+        await aacquire(url)
+    kind = upstream_kind(url)
+    try:
+        with UPSTREAM_SECONDS.time(kind=kind):
+            r = await get_async_client().get(url, **kwargs)
+    except Exception:
+        UPSTREAM_REQUESTS.inc(kind=kind, status="error")
+        raise
+    UPSTREAM_REQUESTS.inc(kind=kind, status=str(r.status_code))
+    return r
+
+
+def _coalesce(key: Hashable, fn):
+    with stage("upstream"):
+        if not HTTP_SINGLE_FLIGHT:
+            return fn()
+        result, shared = _FLIGHTS.do(key, fn)
+    if shared:
+        UPSTREAM_COALESCED.inc(kind=upstream_kind(key[1]))
+    # Parsed JSON is mutable; followers get their own copy
+    return copy.deepcopy(result) if shared and key[0] == "json" else result
+
+
+async def _acoalesce(key: Hashable, fn):
+    with stage("upstream"):
+        if not HTTP_SINGLE_FLIGHT:
+            return await fn()
+        result, shared = await _AFLIGHTS.do(key, fn)
+    if shared:
+        UPSTREAM_COALESCED.inc(kind=upstream_kind(key[1]))
+    return copy.deepcopy(result) if shared and key[0] == "json" else result
+
+
+def get_json(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+) -> Any:
+    def _fetch() -> Any:
+        r = _send(url, timeout=timeout, headers=headers)
+        r.raise_for_status()
+        return r.json()
+
+    return _coalesce(_flight_key("json", url, headers), _fetch)
+
+
+def _conditional_headers(
+    headers: Optional[Dict[str, Optional[str]]],
+    etag: Optional[str],
+    last_modified: Optional[str],
+) -> Optional[Dict[str, Optional[str]]]:
+    if not etag and not last_modified:
+        return headers
+    out = dict(headers or {})
+    if etag:
+        out["if-none-match"] = etag
+    if last_modified:
+        out["if-modified-since"] = last_modified
+    return out
+
+
+def _fetched(r, body: Optional[Union[str, bytes]]) -> Fetched:
+    return Fetched(
+        body if r.status_code == 200 else None,
+        r.headers.get("etag"),
+        r.headers.get("last-modified"),
+        r.status_code == 304,
+    )
+
+
+def get_text_validated(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Fetched:
+    """GET text, sending ``If-None-Match``/``If-Modified-Since`` if given."""
+    headers = _conditional_headers(headers, etag, last_modified)
+
+    def _fetch() -> Fetched:
+        r = _send(
+            url, timeout=timeout, allow_redirects=allow_redirects, headers=headers
+        )
+        return _fetched(r, r.text if (r.text or "").strip() else None)
+
+    return _coalesce(_flight_key("text", url, headers, allow_redirects), _fetch)
 
 
 def get_text(
-    url: str, *, timeout: float = REQUEST_TIMEOUT, allow_redirects: bool = True
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+) -> Optional[str]:
+    return get_text_validated(
+        url, timeout=timeout, allow_redirects=allow_redirects, headers=headers
+    ).body
+
+
+def get_bytes_validated(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Fetched:
+    headers = _conditional_headers(headers, etag, last_modified)
+
+    def _fetch() -> Fetched:
+        r = _send(
+            url, timeout=timeout, allow_redirects=allow_redirects, headers=headers
+        )
+        return _fetched(r, r.content or None)
+
+    return _coalesce(_flight_key("bytes", url, headers, allow_redirects), _fetch)
+
+
+def get_bytes(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+) -> Optional[bytes]:
+    return get_bytes_validated(
+        url, timeout=timeout, allow_redirects=allow_redirects, headers=headers
+    ).body
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+        timeout=REQUEST_TIMEOUT,
+    )
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except Exception:
+        pass
+
+
+# close tasks of replaced clients, referenced until they are done
+_CLOSING: Set["asyncio.Future[None]"] = set()
+
+
+def _discard_async_client(
+    client: httpx.AsyncClient,
+    old_loop: Optional[asyncio.AbstractEventLoop],
+    loop: asyncio.AbstractEventLoop,
+) -> None:
+    if client.is_closed:
+        return
+    if old_loop is not None and old_loop.is_running():
+        # still serving another thread: close it where its sockets live
+        fut = asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(_aclose_quietly(client), old_loop),
+            loop=loop,
+        )
+    else:
+        # its loop is gone (e.g. a finished asyncio.run); release the pool here
+        fut = loop.create_task(_aclose_quietly(client))
+    _CLOSING.add(fut)
+    fut.add_done_callback(_CLOSING.discard)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The pooled client of the running event loop.
+
+    The lifespan handler closes it on shutdown. A client left behind by
+    another loop is closed when it is replaced, so its pool does not leak.
+    """
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    loop = asyncio.get_running_loop()
+    if (
+        _ASYNC_CLIENT is None
+        or _ASYNC_CLIENT.is_closed
+        or _ASYNC_CLIENT_LOOP is not loop
+    ):
+        if _ASYNC_CLIENT is not None:
+            _discard_async_client(_ASYNC_CLIENT, _ASYNC_CLIENT_LOOP, loop)
+        _ASYNC_CLIENT = _new_async_client()
+        _ASYNC_CLIENT_LOOP = loop
+    return _ASYNC_CLIENT
+
+
+async def aclose_async_client() -> None:
+    global _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP
+    client, _ASYNC_CLIENT, _ASYNC_CLIENT_LOOP = _ASYNC_CLIENT, None, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+async def aget_json(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+) -> Any:
+    async def _fetch() -> Any:
+        r = await _asend(url, timeout=timeout, headers=_merge_headers(headers))
+        r.raise_for_status()
+        return r.json()
+
+    return await _acoalesce(_flight_key("json", url, headers), _fetch)
+
+
+async def aget_text_validated(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> Fetched:
+    headers = _conditional_headers(headers, etag, last_modified)
+
+    async def _fetch() -> Fetched:
+        r = await _asend(
+            url,
+            timeout=timeout,
+            follow_redirects=allow_redirects,
+            headers=_merge_headers(headers),
+        )
+        return _fetched(r, r.text if (r.text or "").strip() else None)
+
+    return await _acoalesce(_flight_key("text", url, headers, allow_redirects), _fetch)
+
+
+async def aget_text(
+    url: str,
+    *,
+    timeout: float = REQUEST_TIMEOUT,
+    allow_redirects: bool = True,
+    headers: Optional[Dict[str, Optional[str]]] = None,
 ) -> Optional[str]:
-    r = SESSION.get(url, timeout=timeout, allow_redirects=allow_redirects)
-    if r.status_code == 200 and (r.text or "").strip():
-        return r.text
-    return None
+    fetched = await aget_text_validated(
+        url, timeout=timeout, allow_redirects=allow_redirects, headers=headers
+    )
+    return fetched.body
@@ -1,19 +1,29 @@
+import asyncio
 import json
 import re
 from datetime import datetime
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 import unicodedata
 from bs4 import BeautifulSoup
-from ..config import BASE, REQUEST_TIMEOUT, USE_CACHE_DEFAULT, CACHE_DIR
-from .http import get_text, temp_headers
+from ..config import (
+    BASE,
+    REQUEST_TIMEOUT,
+    USE_CACHE_DEFAULT,
+    MATCH_DETAILS_CONCURRENCY,
+)
+from .http import Fetched, get_text_validated
+from .cache import CacheHit, cache_lookup, cache_refresh, cache_write, match_ttl
 from .utils import (
-    cache_path_for,
+    make_soup,
     abs_url,
     _text_or_none,
     game_id_IN_URL,
     STAFFEL_LINK_IN_HTML,
 )
 from .obfuscation import _collect_obfuscation_maps_for_page, decode_all_obf_in
+from .metrics import MATCH_PAGES, MATCH_SECONDS, PARSE_SECONDS
+from .timing import staged
 
 _TIME_RX = re.compile(r"\b([0-2]\d:[0-5]\d)\b")
 _DATE_RX = re.compile(r"\b([0-3]\d\.[01]\d\.\d{2,4})\b")
@@ -27,44 +37,123 @@ WEEKDAY_RX = re.compile(
 ZWSP_RX = re.compile(r"[\u200b-\u200f\uFEFF]")
 
 
-def _normalize_date_time_fields(
-    d: Dict[str, Optional[str]],
-) -> Dict[str, Optional[str]]:
-    raw_time = d.get("time") or ""
-    raw_time = unicodedata.normalize("NFKC", raw_time)
+@lru_cache(maxsize=4096)
+def _parse_time_text(
+    raw: str,
+) -> Tuple[Optional[Tuple[str, str, str]], Optional[str], Optional[str]]:
+    # Returns (iso (time, date, isoformat) | None, HH:MM | None, dd.mm.yyyy | None).
+    # Calendar pages repeat the same few time strings, hence the cache.
+    raw_time = unicodedata.normalize("NFKC", raw)
     raw_time = raw_time.replace("\u00a0", " ").replace("\u202f", " ")
     raw_time = ZWSP_RX.sub("", raw_time).strip()
 
+    iso = None
     m_iso = _ISO_RX.search(raw_time)
     if m_iso:
         s = m_iso.group(0).replace("Z", "+00:00")
         try:
             dt = datetime.fromisoformat(s)
-            d["time"] = dt.strftime("%H:%M")
-            d.setdefault("date_label", dt.strftime("%d.%m.%Y"))
-            d["datetime_iso"] = dt.isoformat()
+            iso = (dt.strftime("%H:%M"), dt.strftime("%d.%m.%Y"), dt.isoformat())
         except Exception:
             pass
 
     m_time = _TIME_RX.search(raw_time)
-    if m_time:
-        d["time"] = m_time.group(1)
+    m_date = _DATE_RX.search(raw_time)
+    return iso, m_time.group(1) if m_time else None, m_date.group(1) if m_date else None
+
+
+@lru_cache(maxsize=1024)
+def _split_date_label(dl: str) -> Tuple[str, Optional[str]]:
+    # "Samstag, 27.09.2025" -> ("27.09.2025", "Samstag, 27.09.2025")
+    if not WEEKDAY_RX.search(dl):
+        return dl, None
+    only_date = _DATE_RX.search(dl)
+    return (only_date.group(1) if only_date else dl), dl
+
 
-    if not d.get("date_label"):
-        m_date = _DATE_RX.search(raw_time)
-        if m_date:
-            d["date_label"] = m_date.group(1)
+def _normalize_date_time_fields(
+    d: Dict[str, Optional[str]],
+) -> Dict[str, Optional[str]]:
+    iso, time_val, date_val = _parse_time_text(d.get("time") or "")
+    if iso:
+        d["time"] = iso[0]
+        d.setdefault("date_label", iso[1])
+        d["datetime_iso"] = iso[2]
+
+    if time_val:
+        d["time"] = time_val
 
-    if d.get("date_label") and WEEKDAY_RX.search(d["date_label"]):
-        dl = d["date_label"]
-        d["date_label_long"] = dl
-        only_date = _DATE_RX.search(dl)
-        if only_date:
-            d["date_label"] = only_date.group(1)
+    if not d.get("date_label") and date_val:
+        d["date_label"] = date_val
+
+    if d.get("date_label"):
+        date_label, date_label_long = _split_date_label(d["date_label"])
+        if date_label_long:
+            d["date_label_long"] = date_label_long
+            d["date_label"] = date_label
 
     return d
 
 
+# Bump whenever a match-page extractor changes its output, so parsed
+# records cached by an older parser are ignored.
+MATCH_PARSER_VERSION = "2"
+
+
+def _lookup_parsed_match(
+    sid: str,
+) -> Tuple[Optional[Dict[str, Dict[str, Optional[str]]]], bool]:
+    """Cached parsed record (possibly expired) and whether it is still fresh."""
+    hit = cache_lookup("match_parsed", sid, suffix=".json")
+    if hit is None or not hit.value:
+        return None, False
+    try:
+        payload = json.loads(hit.value)
+    except ValueError:
+        return None, False
+    if payload.get("v") != MATCH_PARSER_VERSION:
+        return None, False
+    return payload.get("data"), hit.fresh
+
+
+def _read_parsed_match(sid: str) -> Optional[Dict[str, Dict[str, Optional[str]]]]:
+    record, fresh = _lookup_parsed_match(sid)
+    if record is None or not fresh:
+        return None
+    return record
+
+
+def _record_ttl(record: Dict[str, Dict[str, Optional[str]]]) -> Optional[float]:
+    full = record["full"]
+    return match_ttl(full.get("date_label"), full.get("score"))
+
+
+def _match_cache_sid(url: str) -> str:
+    m = game_id_IN_URL.search(url)
+    return (m.group(1) if m else re.sub(r"\W+", "_", url)) or "unknown"
+
+
+def read_cached_match_full(match_link: str) -> Optional[Dict[str, Optional[str]]]:
+    """Parsed ``fetch_match_full`` result from the cache, without any I/O upstream."""
+    url = abs_url(match_link or "")
+    if not url:
+        return None
+    record = _read_parsed_match(_match_cache_sid(url))
+    if record is None:
+        return None
+    return dict(record["full"])
+
+
+def _write_parsed_match(sid: str, record: Dict[str, Dict[str, Optional[str]]]) -> None:
+    cache_write(
+        "match_parsed",
+        sid,
+        json.dumps({"v": MATCH_PARSER_VERSION, "data": record}, ensure_ascii=False),
+        _record_ttl(record),
+        ".json",
+    )
+
+
 ED_VARS = {
     "home": r"edHeimmannschaftName='([^']+)'",
     "away": r"edGastmannschaftName='([^']+)'",
@@ -84,15 +173,24 @@ def _extract_ed_vars(html: str) -> dict:
     return out
 
 
-def _get_ok_html(url: str) -> Optional[str]:
+_MATCH_PAGE_HEADERS = {
+    "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "x-requested-with": None,
+    "referer": BASE,
+}
+
+
+def _fetch_match_html(url: str, hit: Optional[CacheHit] = None) -> Fetched:
+    """GET a match page; with a cached ``hit`` the request is conditional."""
     if not url:
-        return None
-    with temp_headers(
-        accept="text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        **{"x-requested-with": None},
-        referer=BASE,
-    ):
-        return get_text(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        return Fetched(None)
+    return get_text_validated(
+        url,
+        timeout=REQUEST_TIMEOUT,
+        allow_redirects=True,
+        headers=_MATCH_PAGE_HEADERS,
+        **(hit.validators() if hit else {}),
+    )
 
 
 def _extract_jsonld_event(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
@@ -157,42 +255,25 @@ def _extract_jsonld_event(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     return out
 
 
-def fetch_match_details(
-    spiel_link: str, use_cache: bool = USE_CACHE_DEFAULT
-) -> Dict[str, Optional[str]]:
-    url = abs_url(spiel_link or "")
-    if not url:
-        return {}
-    m = game_id_IN_URL.search(url)
-    sid_for_cache = (m.group(1) if m else re.sub(r"\W+", "_", url)) or "unknown"
-    cache_file = cache_path_for("match", sid_for_cache) + ".html"
+def _load_match_html(
+    url: str, sid: str, use_cache: bool
+) -> Tuple[Optional[str], Optional[Fetched]]:
+    """Match page HTML plus the upstream response (None if served from cache).
 
-    html = None
-    if use_cache:
-        try:
-            import os
+    An expired page is revalidated; on 304 the cached HTML is returned.
+    """
+    hit = cache_lookup("match", sid, suffix=".html") if use_cache else None
+    if hit is not None and hit.fresh and hit.value:
+        return hit.value, None
+    fetched = _fetch_match_html(url, hit)
+    if fetched.not_modified and hit is not None:
+        return hit.value, fetched
+    return fetched.body, fetched
 
-            if os.path.exists(cache_file):
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    html = f.read()
-        except Exception:
-            html = None
-
-    if not html:
-        html = _get_ok_html(url)
-        if use_cache and html:
-            try:
-                with open(cache_file, "w", encoding="utf-8") as f:
-                    f.write(html)
-            except Exception:
-                pass
-
-    if not html:
-        return {}
-
-    soup = BeautifulSoup(html, "html.parser")
-    text = soup.get_text("\n", strip=True)
 
+def _extract_detail_fields(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+    """Legacy ``fetch_match_details`` extractor (dt/dd tables, plain text)."""
+    text = None
     staffel_id = None
     a_staffel = soup.find("a", href=STAFFEL_LINK_IN_HTML)
     if a_staffel and a_staffel.get("href"):
@@ -212,6 +293,7 @@ def fetch_match_details(
     staffelnummer = _find_dt_dd(r"^Staffel(?:\-|\s*)?nummer")
 
     if not spielnummer:
+        text = text or soup.get_text("\n", strip=True)
         m = re.search(
             r"Spiel(?:\-|\s*)?nummer\s*[:\-]?\s*([A-Z0-9\-]+)", text, flags=re.I
         )
@@ -219,6 +301,7 @@ def fetch_match_details(
             spielnummer = m.group(1).strip()
 
     if not staffelnummer:
+        text = text or soup.get_text("\n", strip=True)
         m = re.search(
             r"Staffel(?:\-|\s*)?nummer\s*[:\-]?\s*([A-Z0-9\-]+)", text, flags=re.I
         )
@@ -232,43 +315,9 @@ def fetch_match_details(
     }
 
 
-def fetch_match_full(
-    match_link: str, use_cache: bool = USE_CACHE_DEFAULT
+def _extract_full_fields(
+    soup: BeautifulSoup, html: str, url: str, page_maps: Dict[str, Dict[str, str]]
 ) -> Dict[str, Optional[str]]:
-    url = abs_url(match_link or "")
-    if not url:
-        return {}
-
-    m = game_id_IN_URL.search(url)
-    sid_for_cache = (m.group(1) if m else re.sub(r"\W+", "_", url)) or "unknown"
-    cache_file = (
-        cache_path_for("match_full", f"full_{sid_for_cache}", CACHE_DIR) + ".html"
-    )
-
-    html = None
-    if use_cache:
-        try:
-            import os
-
-            if os.path.exists(cache_file):
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    html = f.read()
-        except Exception:
-            pass
-    if not html:
-        html = _get_ok_html(url)
-        if use_cache and html:
-            try:
-                with open(cache_file, "w", encoding="utf-8") as f:
-                    f.write(html)
-            except Exception:
-                pass
-    if not html:
-        return {}
-
-    soup = BeautifulSoup(html, "html.parser")
-    page_maps = _collect_obfuscation_maps_for_page(soup, use_cache=use_cache)
-
     canonical = None
     link_tag = soup.find("link", rel=lambda x: x and x.lower() == "canonical")
     if link_tag and link_tag.get("href"):
@@ -390,3 +439,130 @@ def fetch_match_full(
         "assistant_2": sra2,
     }
     return _normalize_date_time_fields(out)
+
+
+@staged("parse")
+@PARSE_SECONDS.timed(stage="match_page")
+def _parse_match_page(
+    html: str, url: str, use_cache: bool = USE_CACHE_DEFAULT
+) -> Dict[str, Dict[str, Optional[str]]]:
+    """Parse a match page once and run every field extractor over that soup."""
+    soup = make_soup(html)
+    page_maps = _collect_obfuscation_maps_for_page(soup, use_cache=use_cache)
+    return {
+        "full": _extract_full_fields(soup, html, url, page_maps),
+        "details": _extract_detail_fields(soup),
+    }
+
+
+@MATCH_SECONDS.timed()
+def fetch_match_page(
+    match_link: str, use_cache: bool = USE_CACHE_DEFAULT
+) -> Optional[Dict[str, Dict[str, Optional[str]]]]:
+    """Fetch, parse and cache a match page; one cache key per ``game_id``.
+
+    Returns ``{"full": ..., "details": ...}`` or ``None`` if the page is not
+    available. ``fetch_match_full`` and ``fetch_match_details`` are views
+    over this record.
+    """
+    url = abs_url(match_link or "")
+    if not url:
+        return None
+    sid = _match_cache_sid(url)
+
+    record, fresh = _lookup_parsed_match(sid) if use_cache else (None, False)
+    if record and fresh:
+        MATCH_PAGES.inc(source="cached")
+        return record
+
+    html, fetched = _load_match_html(url, sid, use_cache)
+    if not html:
+        MATCH_PAGES.inc(source="missing")
+        return None
+
+    unchanged = fetched is not None and fetched.not_modified
+    if unchanged and record:
+        # 304: the stale parse is still valid, only restart both TTLs
+        ttl = _record_ttl(record)
+        cache_refresh("match", sid, ttl, ".html")
+        cache_refresh("match_parsed", sid, ttl, ".json")
+        MATCH_PAGES.inc(source="revalidated")
+        return record
+
+    MATCH_PAGES.inc(source="parsed")
+    record = _parse_match_page(html, url, use_cache=use_cache)
+    if use_cache:
+        # Written after parsing: the TTL depends on whether the match is final
+        ttl = _record_ttl(record)
+        if unchanged:
+            cache_refresh("match", sid, ttl, ".html")
+        elif fetched is not None:
+            cache_write(
+                "match",
+                sid,
+                html,
+                ttl,
+                ".html",
+                etag=fetched.etag,
+                last_modified=fetched.last_modified,
+            )
+        _write_parsed_match(sid, record)
+    return record
+
+
+def fetch_match_details(
+    spiel_link: str, use_cache: bool = USE_CACHE_DEFAULT
+) -> Dict[str, Optional[str]]:
+    record = fetch_match_page(spiel_link, use_cache)
+    return dict(record["details"]) if record else {}
+
+
+def fetch_match_full(
+    match_link: str, use_cache: bool = USE_CACHE_DEFAULT
+) -> Dict[str, Optional[str]]:
+    record = fetch_match_page(match_link, use_cache)
+    return dict(record["full"]) if record else {}
+
+
+_GAME_ID_ONLY_RX = re.compile(r"^[A-Za-z0-9]{16,}$")
+
+
+def match_link_for(item: str) -> str:
+    """Accept a match link or a bare game_id (upstream resolves the slug)."""
+    item = (item or "").strip()
+    if _GAME_ID_ONLY_RX.match(item):
+        return f"{BASE}/spiel/-/spiel/{item}"
+    return item
+
+
+async def aiter_match_full_many(
+    items: List[str],
+    use_cache: bool = USE_CACHE_DEFAULT,
+    concurrency: int = MATCH_DETAILS_CONCURRENCY,
+) -> AsyncIterator[Tuple[int, Optional[Dict[str, Optional[str]]], Optional[str]]]:
+    """Fetch and parse many matches concurrently.
+
+    Yields ``(index, match, error)`` in completion order. Upstream pacing is
+    left to the shared rate limiter in http.py.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(i: int, item: str):
+        async with sem:
+            try:
+                m = await asyncio.to_thread(
+                    fetch_match_full, match_link_for(item), use_cache
+                )
+            except Exception as e:
+                return i, None, f"{type(e).__name__}: {e}"
+        if not m:
+            return i, None, "Match nicht gefunden oder lesbar"
+        return i, m, None
+
+    tasks = [asyncio.create_task(_one(i, item)) for i, item in enumerate(items)]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            yield await fut
+    finally:
+        for t in tasks:
+            t.cancel()
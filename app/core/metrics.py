@@ -0,0 +1,244 @@
+"""Minimal in-process metrics in the Prometheus text format.
+
+Recording is a dict update under a per-metric lock; nothing is formatted
+until ``/metrics`` is scraped. ``METRICS_ENABLED=0`` turns every recording
+call into a no-op.
+"""
+
+import bisect
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+from ..config import METRICS_ENABLED
+
+_REGISTRY: List["_Metric"] = []
+
+# Seconds; covers sub-millisecond parses up to slow upstream pages
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, doc, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {v:g}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("_hist", "_labels", "_start")
+
+    def __init__(self, hist: "Histogram", labels: Dict[str, str]):
+        self._hist = hist
+        self._labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._hist.observe(time.perf_counter() - self._start, **self._labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, doc, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            item = self._values.get(key)
+            if item is None:
+                item = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            item[0][i] += 1
+            item[1][0] += value
+
+    def time(self, **labels: str) -> _Timer:
+        return _Timer(self, labels)
+
+    def timed(self, **labels: str) -> Callable:
+        """Decorator form of ``time``."""
+
+        def wrap(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                if not METRICS_ENABLED:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, **labels)
+
+            return inner
+
+        return wrap
+
+    def count(self, **labels: str) -> int:
+        item = self._values.get(self._key(labels))
+        return sum(item[0]) if item else 0
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            items = sorted(
+                (k, (list(counts), total[0]))
+                for k, (counts, total) in self._values.items()
+            )
+        for key, (counts, total) in items:
+            acc = 0
+            for bound, n in zip(self.buckets, counts):
+                acc += n
+                le = _labels(self.labelnames, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{le} {acc}")
+            acc += counts[-1]
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {acc}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:g}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {acc}")
+        return lines
+
+
+def render_latest() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def upstream_kind(url: str) -> str:
+    """Coarse endpoint type of an upstream URL, used as a metric label."""
+    if "ajax.match.calendar" in url:
+        return "calendar"
+    if "getPostalCodeCompletions" in url:
+        return "postal"
+    if "/type/font" in url or "format/woff" in url:
+        return "woff"
+    if "fontface" in url or "obfuscation" in url or ".css" in url:
+        return "obf_css"
+    if "/spiel/" in url:
+        return "match"
+    return "other"
+
+
+UPSTREAM_SECONDS = Histogram(
+    "fbde_upstream_request_seconds",
+    "Upstream request latency (without rate-limit wait) by endpoint type.",
+    ("kind",),
+)
+UPSTREAM_REQUESTS = Counter(
+    "fbde_upstream_requests_total",
+    "Upstream requests by endpoint type and HTTP status (error = no response).",
+    ("kind", "status"),
+)
+UPSTREAM_COALESCED = Counter(
+    "fbde_upstream_coalesced_total",
+    "Requests that shared an identical in-flight upstream request.",
+    ("kind",),
+)
+CACHE_LOOKUPS = Counter(
+    "fbde_cache_lookups_total",
+    "Cache lookups by category and result (hit, stale, miss).",
+    ("category", "result"),
+)
+CACHE_WRITES = Counter(
+    "fbde_cache_writes_total", "Cache writes by category.", ("category",)
+)
+CALENDAR_PAGES = Histogram(
+    "fbde_calendar_pages_per_plz",
+    "Calendar pages fetched per PLZ and window.",
+    buckets=(1, 2, 3, 5, 8, 13, 21),
+)
+PARSE_SECONDS = Histogram(
+    "fbde_parse_seconds",
+    "HTML parsing time by stage (calendar, match_page, obf_decode).",
+    ("stage",),
+)
+MATCH_SECONDS = Histogram(
+    "fbde_match_fetch_seconds",
+    "End-to-end match page load (cache, upstream and parse).",
+)
+MATCH_PAGES = Counter(
+    "fbde_match_pages_total",
+    "Match page loads by source (cached, revalidated, parsed, missing).",
+    ("source",),
+)
@@ -1,6 +1,14 @@
+import contextvars
+import html
+import json
 import re
-from typing import Dict, Optional, List
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional, List, Tuple
 from io import BytesIO
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
 try:
@@ -8,11 +16,59 @@ try:
 except Exception:
     TTFont = None  # optional
 
-from ..config import BASE, REQUEST_TIMEOUT, CACHE_DIR
-from .http import get_text, temp_headers
-from .utils import cache_path_for
-
-_OBF_CACHE: Dict[str, Dict[int, str]] = {}
+from ..config import (
+    BASE,
+    REQUEST_TIMEOUT,
+    OBF_MAP_CACHE_SIZE,
+    OBF_NEGATIVE_TTL,
+    OBF_FETCH_CONCURRENCY,
+)
+from .http import get_text_validated, get_bytes_validated
+from .metrics import PARSE_SECONDS
+from .timing import staged
+from .cache import (
+    cache_lookup,
+    cache_refresh,
+    cache_write,
+    OBFUSCATION_TTL,
+)
+
+
+class _ObfMapLRU:
+    """Bounded, thread-safe LRU of decoded maps with optional expiry."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self._data: "OrderedDict[str, Tuple[Dict[int, str], Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def get(self, obf_id: str) -> Optional[Dict[int, str]]:
+        with self._lock:
+            item = self._data.get(obf_id)
+            if item is None:
+                return None
+            mapping, expires_at = item
+            if expires_at is not None and time.time() >= expires_at:
+                del self._data[obf_id]
+                return None
+            self._data.move_to_end(obf_id)
+            return mapping
+
+    def put(self, obf_id: str, mapping: Dict[int, str], ttl: Optional[float]) -> None:
+        expires_at = None if ttl is None else time.time() + ttl
+        with self._lock:
+            self._data[obf_id] = (mapping, expires_at)
+            self._data.move_to_end(obf_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_OBF_CACHE = _ObfMapLRU(OBF_MAP_CACHE_SIZE)
 
 _ENTITY_HEX_RX = re.compile(r"&#x([0-9A-Fa-f]{4,6});")
 
@@ -23,31 +79,31 @@ def _fetch_obfuscation_css(
     url = (css_tpl_url or "").replace("%ID%", obf_id)
     if not url:
         return None
-    cache_file = cache_path_for("obfcss", f"{obf_id}.css", CACHE_DIR) + ".css"
-    if use_cache:
-        try:
-            import os
-
-            if os.path.exists(cache_file):
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    return f.read()
-        except Exception:
-            pass
-    with temp_headers(accept="text/css,*/*;q=0.1", referer=BASE):
-        css = get_text(
-            url if url.startswith("http") else ("https:" + url),
-            timeout=REQUEST_TIMEOUT,
-            allow_redirects=True,
-        )
+    hit = cache_lookup("obfcss", f"{obf_id}.css", suffix=".css") if use_cache else None
+    if hit is not None and hit.fresh and hit.value:
+        return hit.value
+    fetched = get_text_validated(
+        # the template is protocol-relative; resolve it against FBDE_BASE
+        urljoin(BASE, url),
+        timeout=REQUEST_TIMEOUT,
+        allow_redirects=True,
+        headers={"accept": "text/css,*/*;q=0.1", "referer": BASE},
+        **(hit.validators() if hit else {}),
+    )
+    if fetched.not_modified and hit is not None:
+        cache_refresh("obfcss", f"{obf_id}.css", OBFUSCATION_TTL, ".css")
+        return hit.value
+    css = fetched.body
     if css and use_cache:
-        try:
-            import os
-
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-            with open(cache_file, "w", encoding="utf-8") as f:
-                f.write(css)
-        except Exception:
-            pass
+        cache_write(
+            "obfcss",
+            f"{obf_id}.css",
+            css,
+            OBFUSCATION_TTL,
+            ".css",
+            etag=fetched.etag,
+            last_modified=fetched.last_modified,
+        )
     return css
 
 
@@ -75,34 +131,36 @@ def _build_obfuscation_map_from_css(css: str) -> Dict[int, str]:
 
 
 def _fetch_obfuscation_font(obf_id: str, use_cache: bool = True) -> Optional[bytes]:
-    url = f"https://www.fussball.de/export.fontface/-/format/woff/id/{obf_id}/type/font"
-    cache_file = cache_path_for("obfcss", f"{obf_id}.woff", CACHE_DIR) + ".woff"
-    if use_cache:
-        try:
-            import os
-
-            if os.path.exists(cache_file):
-                with open(cache_file, "rb") as f:
-                    return f.read()
-        except Exception:
-            pass
-    with temp_headers(accept="font/woff,*/*;q=0.1", referer=BASE):
-        import requests
-
-        r = requests.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
-        if r.status_code == 200 and r.content:
-            data = r.content
-            if use_cache:
-                try:
-                    import os
-
-                    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-                    with open(cache_file, "wb") as f:
-                        f.write(data)
-                except Exception:
-                    pass
-            return data
-    return None
+    url = f"{BASE}/export.fontface/-/format/woff/id/{obf_id}/type/font"
+    hit = (
+        cache_lookup("obfcss", f"{obf_id}.woff", suffix=".woff", binary=True)
+        if use_cache
+        else None
+    )
+    if hit is not None and hit.fresh and hit.value:
+        return hit.value
+    fetched = get_bytes_validated(
+        url,
+        timeout=REQUEST_TIMEOUT,
+        allow_redirects=True,
+        headers={"accept": "font/woff,*/*;q=0.1", "referer": BASE},
+        **(hit.validators() if hit else {}),
+    )
+    if fetched.not_modified and hit is not None:
+        cache_refresh("obfcss", f"{obf_id}.woff", OBFUSCATION_TTL, ".woff")
+        return hit.value
+    data = fetched.body
+    if data and use_cache:
+        cache_write(
+            "obfcss",
+            f"{obf_id}.woff",
+            data,
+            OBFUSCATION_TTL,
+            ".woff",
+            etag=fetched.etag,
+            last_modified=fetched.last_modified,
+        )
+    return data
 
 
 def _build_obfuscation_map_from_font(woff_bytes: bytes) -> Dict[int, str]:
@@ -133,6 +191,64 @@ def _build_obfuscation_map_from_font(woff_bytes: bytes) -> Dict[int, str]:
     return mapping
 
 
+def _obf_map_ttl(obf_map: Dict[int, str]) -> Optional[float]:
+    # A failed lookup may be a temporary upstream problem: retry it soon
+    return OBFUSCATION_TTL if obf_map else OBF_NEGATIVE_TTL
+
+
+def _load_obf_map(obf_id: str, use_cache: bool) -> Optional[Dict[int, str]]:
+    obf_map = _OBF_CACHE.get(obf_id)
+    if obf_map is not None or not use_cache:
+        return obf_map
+    # Decoded maps are shared with the other workers through the cache store
+    hit = cache_lookup("obfmap", obf_id, suffix=".json")
+    if hit is None or not hit.fresh:
+        return None
+    try:
+        obf_map = {int(cp): ch for cp, ch in json.loads(hit.value)}
+    except (ValueError, TypeError):
+        return None
+    # Keep the stored expiry: a fresh TTL per worker would keep re-arming
+    # negative entries, so they would never be retried
+    ttl = None if hit.expires_at is None else max(0.0, hit.expires_at - time.time())
+    _OBF_CACHE.put(obf_id, obf_map, ttl)
+    return obf_map
+
+
+def _store_obf_map(obf_id: str, obf_map: Dict[int, str], use_cache: bool) -> None:
+    ttl = _obf_map_ttl(obf_map)
+    _OBF_CACHE.put(obf_id, obf_map, ttl)
+    if use_cache:
+        payload = json.dumps(sorted(obf_map.items()), ensure_ascii=False)
+        cache_write("obfmap", obf_id, payload, ttl, ".json")
+
+
+# Leaf downloads only (no task waits on another task), so the pool can't
+# deadlock however many pages resolve ids at the same time.
+_FETCH_POOL = ThreadPoolExecutor(
+    max_workers=max(1, OBF_FETCH_CONCURRENCY), thread_name_prefix="obf-fetch"
+)
+# obf_id -> Future of the map, shared by concurrent requests for the same id
+_INFLIGHT: Dict[str, Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+
+def _submit(fn: Callable, *args) -> Future:
+    # run in a copy of the caller's context, so request timings and
+    # profiling see the work done in the pool threads
+    return _FETCH_POOL.submit(contextvars.copy_context().run, fn, *args)
+
+
+def _result_or_none(fut: Optional[Future]):
+    if fut is None:
+        return None
+    try:
+        return fut.result()
+    except Exception:
+        return None
+
+
+@staged("obf")
 def _collect_obfuscation_maps_for_page(
     soup: BeautifulSoup, use_cache: bool = True
 ) -> Dict[str, Dict[int, str]]:
@@ -146,47 +262,87 @@ def _collect_obfuscation_maps_for_page(
         if el.get("data-obfuscation")
     }
 
+    missing: List[str] = []
     for obf_id in sorted(ids or []):
-        if obf_id in _OBF_CACHE:
-            maps[obf_id] = _OBF_CACHE[obf_id]
-            continue
+        cached = _load_obf_map(obf_id, use_cache)
+        if cached is not None:
+            maps[obf_id] = cached
+        else:
+            missing.append(obf_id)
+    if not missing:
+        return maps
+
+    owned: Dict[str, Future] = {}
+    waiting: Dict[str, Future] = {}
+    with _INFLIGHT_LOCK:
+        for obf_id in missing:
+            fut = _INFLIGHT.get(obf_id)
+            if fut is None:
+                fut = _INFLIGHT[obf_id] = owned[obf_id] = Future()
+            else:
+                waiting[obf_id] = fut
 
-        obf_map: Dict[int, str] = {}
-        if css_tpl:
-            css = _fetch_obfuscation_css(obf_id, css_tpl, use_cache=use_cache)
+    # The CSS of every id goes out at once; the font is only fetched, again
+    # in parallel, for the ids whose CSS yields no map.
+    found: Dict[str, Dict[int, str]] = {obf_id: {} for obf_id in owned}
+    try:
+        css_futs = {
+            obf_id: _submit(_fetch_obfuscation_css, obf_id, css_tpl, use_cache)
+            for obf_id in owned
+            if css_tpl
+        }
+        for obf_id, css_fut in css_futs.items():
+            css = _result_or_none(css_fut)
             if css:
-                obf_map = _build_obfuscation_map_from_css(css)
-
-        if not obf_map:
-            woff_bytes = _fetch_obfuscation_font(obf_id, use_cache=use_cache)
+                found[obf_id] = _build_obfuscation_map_from_css(css)
+
+        woff_futs = {
+            obf_id: _submit(_fetch_obfuscation_font, obf_id, use_cache)
+            for obf_id, obf_map in found.items()
+            if not obf_map
+        }
+        for obf_id, woff_fut in woff_futs.items():
+            woff_bytes = _result_or_none(woff_fut)
             if woff_bytes:
-                obf_map = _build_obfuscation_map_from_font(woff_bytes)
+                found[obf_id] = _build_obfuscation_map_from_font(woff_bytes)
+
+        for obf_id, obf_map in found.items():
+            _store_obf_map(obf_id, obf_map, use_cache)
+    finally:
+        for obf_id, fut in owned.items():
+            fut.set_result(found[obf_id])
+            with _INFLIGHT_LOCK:
+                _INFLIGHT.pop(obf_id, None)
+    maps.update(found)
 
-        _OBF_CACHE[obf_id] = obf_map
-        maps[obf_id] = obf_map
+    for obf_id, fut in waiting.items():
+        maps[obf_id] = fut.result()
 
     return maps
 
 
+_PUA_RX = re.compile("[\ue000-\uf8ff]")
+_TAG_RX = re.compile(r"<[^>]*>")
+_WS_RX = re.compile(r"\s+")
+
+
 def _decode_obfuscated_text(raw_html_or_text: str, obf_map: Dict[int, str]) -> str:
     if not raw_html_or_text:
         return ""
 
-    def _ent_repl(m):
-        cp = int(m.group(1), 16)
-        return obf_map.get(cp, "?")
-
-    s = _ENTITY_HEX_RX.sub(_ent_repl, raw_html_or_text)
+    s = raw_html_or_text
+    if "&#x" in s:
+        s = _ENTITY_HEX_RX.sub(lambda m: obf_map.get(int(m.group(1), 16), "?"), s)
 
-    def _map_chars(txt: str) -> str:
-        if not any(0xE000 <= ord(c) <= 0xF8FF for c in txt):
-            return txt
-        return "".join(obf_map.get(ord(c), c) for c in txt)
+    # Maps are keyed by code point, i.e. they already are str.translate tables
+    if _PUA_RX.search(s):
+        s = s.translate(obf_map)
 
-    s = _map_chars(s)
-    s = BeautifulSoup(s, "html.parser").get_text(" ", strip=True)
+    if "<" in s or "&" in s:
+        # Decoded fragments are tiny: strip tags/entities without a parser
+        s = html.unescape(_TAG_RX.sub(" ", s))
 
-    return re.sub(r"\s+", " ", s).strip()
+    return _WS_RX.sub(" ", s).strip()
 
 
 def _find_ancestor_obf_id(node) -> Optional[str]:
@@ -198,18 +354,49 @@ def _find_ancestor_obf_id(node) -> Optional[str]:
     return None
 
 
+def _obf_scope_resolver() -> Callable[[object], Optional[str]]:
+    # Same lookup as _find_ancestor_obf_id, but every tag on the way up is
+    # resolved only once per decode_all_obf_in call.
+    memo: Dict[int, Optional[str]] = {}
+
+    def resolve(tag) -> Optional[str]:
+        path: List[int] = []
+        result = None
+        cur = tag
+        while cur is not None and getattr(cur, "name", "").lower() not in (
+            "html",
+            "body",
+        ):
+            key = id(cur)
+            if key in memo:
+                result = memo[key]
+                break
+            path.append(key)
+            obf_id = cur.get("data-obfuscation") if hasattr(cur, "get") else None
+            if obf_id:
+                result = obf_id
+                break
+            cur = getattr(cur, "parent", None)
+        for key in path:
+            memo[key] = result
+        return result
+
+    return resolve
+
+
+@staged("obf")
+@PARSE_SECONDS.timed(stage="obf_decode")
 def decode_all_obf_in(el, page_maps: Dict[str, Dict[int, str]]) -> str:
+    resolve = _obf_scope_resolver()
     pieces: List[str] = []
     for txt in el.strings:
-        obf_id = _find_ancestor_obf_id(txt)
-        if obf_id and (page_maps.get(obf_id) or {}):
-            pieces.append(_decode_obfuscated_text(str(txt), page_maps[obf_id]))
+        obf_id = resolve(txt.parent)
+        obf_map = page_maps.get(obf_id) if obf_id else None
+        if obf_map:
+            pieces.append(_decode_obfuscated_text(str(txt), obf_map))
         else:
             pieces.append(str(txt))
-    out = "".join(pieces)
-   
-
-    return re.sub(r"\s+", " ", out).strip()
+    return _WS_RX.sub(" ", "".join(pieces)).strip()
 
 
 __all__ = [
@@ -1,18 +1,191 @@
-from typing import Dict, List
-from ..config import REQUEST_TIMEOUT
-from .http import get_json
+import asyncio
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from ..config import (
+    REQUEST_TIMEOUT,
+    POSTAL_TTL,
+    POSTAL_INDEX_MAX_QUERIES,
+    POSTAL_INDEX_MIN_PREFIX,
+    POSTAL_UPSTREAM_CAP,
+)
+from .http import get_json, aget_json
+from .cache import cache_read, cache_write
+from .timing import staged
 from ..config import BASE
 
+_EntryId = Tuple[str, str, str]
+# entry ids in upstream order, expires_at, complete (below the upstream cap)
+_QueryItem = Tuple[List[_EntryId], Optional[float], bool]
+
+
+def _postal_codes_url(query: str) -> str:
+    return f"{BASE}/public.service/-/action/getPostalCodeCompletions/plz/{query}"
+
+
+def _split_plz_list(area: str) -> List[str]:
+    return [p.strip() for p in area.split(",") if p.strip()]
+
+
+def _norm_query(query: str) -> str:
+    return " ".join((query or "").split()).casefold()
+
+
+class _PostalIndex:
+    """In-memory prefix index over every postal-code completion seen so far.
+
+    Entries are indexed by city, PLZ and district in one sorted token array,
+    so a prefix lookup is a bisect plus a short scan. A query that was not
+    fetched itself is answered from the index only if a shorter query it
+    extends was fetched and returned fewer than ``upstream_cap`` entries
+    (upstream completes by prefix, so every result of the longer query is
+    already known). The answer keeps the order of that shorter result.
+    """
+
+    def __init__(self, max_queries: int, min_prefix: int, upstream_cap: int):
+        self.max_queries = max(1, max_queries)
+        self.min_prefix = max(1, min_prefix)
+        self.upstream_cap = max(1, upstream_cap)
+        self._queries: "OrderedDict[str, _QueryItem]" = OrderedDict()
+        self._entries: Dict[_EntryId, Dict[str, str]] = {}
+        self._tokens: List[Tuple[str, _EntryId]] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry_id(entry: Dict[str, str]) -> _EntryId:
+        return (
+            entry.get("postalCode") or "",
+            entry.get("city") or "",
+            entry.get("district") or "",
+        )
+
+    def add(
+        self, query: str, entries: List[Dict[str, str]], ttl: Optional[float]
+    ) -> None:
+        expires_at = None if ttl is None else time.time() + ttl
+        ids = []
+        with self._lock:
+            for entry in entries:
+                if not isinstance(entry, dict) or not entry.get("postalCode"):
+                    continue
+                eid = self._entry_id(entry)
+                ids.append(eid)
+                if eid not in self._entries:
+                    for token in {_norm_query(t) for t in eid if t}:
+                        bisect.insort(self._tokens, (token, eid))
+                self._entries[eid] = dict(entry)
+            complete = len(entries) < self.upstream_cap
+            self._queries[query] = (ids, expires_at, complete)
+            self._queries.move_to_end(query)
+            while len(self._queries) > self.max_queries:
+                self._queries.popitem(last=False)
+
+    def _fresh_query(self, query: str) -> Optional[Tuple[List[_EntryId], bool]]:
+        item = self._queries.get(query)
+        if item is None:
+            return None
+        ids, expires_at, complete = item
+        if expires_at is not None and time.time() >= expires_at:
+            del self._queries[query]
+            return None
+        self._queries.move_to_end(query)
+        return ids, complete
+
+    def _prefix_ids(self, prefix: str) -> Set[_EntryId]:
+        found: Set[_EntryId] = set()
+        i = bisect.bisect_left(self._tokens, (prefix,))
+        while i < len(self._tokens) and self._tokens[i][0].startswith(prefix):
+            found.add(self._tokens[i][1])
+            i += 1
+        return found
+
+    def lookup(self, query: str) -> Optional[List[Dict[str, str]]]:
+        """Known result for ``query`` or None if upstream must be asked."""
+        with self._lock:
+            exact = self._fresh_query(query)
+            ids = exact[0] if exact is not None else None
+            if ids is None:
+                for n in range(len(query) - 1, self.min_prefix - 1, -1):
+                    parent = self._fresh_query(query[:n])
+                    if parent is not None and parent[1]:
+                        matching = self._prefix_ids(query)
+                        ids = [eid for eid in parent[0] if eid in matching]
+                        break
+            if ids is None:
+                return None
+            return [dict(self._entries[eid]) for eid in ids]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_INDEX = _PostalIndex(
+    POSTAL_INDEX_MAX_QUERIES, POSTAL_INDEX_MIN_PREFIX, POSTAL_UPSTREAM_CAP
+)
+
+
+def _lookup_postal_codes(query: str) -> Optional[List[Dict[str, str]]]:
+    hit = _INDEX.lookup(query)
+    if hit is not None:
+        return hit
+    # shared cache (other workers, earlier runs) before going upstream
+    raw = cache_read("postal", query, suffix=".json")
+    if not raw:
+        return None
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        return None
+    _INDEX.add(query, data, POSTAL_TTL)
+    return data
+
+
+def _remember_postal_codes(query: str, data) -> None:
+    if not isinstance(data, list):
+        return
+    _INDEX.add(query, data, POSTAL_TTL)
+    cache_write(
+        "postal", query, json.dumps(data, ensure_ascii=False), POSTAL_TTL, ".json"
+    )
+
 
 def get_postal_codes(query: str = "Hamburg") -> List[Dict[str, str]]:
-    url = f"{BASE}/public.service/-/action/getPostalCodeCompletions/plz/{query}"
-    data = get_json(url, timeout=REQUEST_TIMEOUT)
+    key = _norm_query(query)
+    hit = _lookup_postal_codes(key)
+    if hit is not None:
+        return hit
+    data = get_json(_postal_codes_url(query), timeout=REQUEST_TIMEOUT)
+    _remember_postal_codes(key, data)
     return data
 
 
+async def aget_postal_codes(query: str = "Hamburg") -> List[Dict[str, str]]:
+    key = _norm_query(query)
+    # the shared cache is blocking file/SQLite I/O, keep it off the event loop
+    hit = await asyncio.to_thread(_lookup_postal_codes, key)
+    if hit is not None:
+        return hit
+    data = await aget_json(_postal_codes_url(query), timeout=REQUEST_TIMEOUT)
+    await asyncio.to_thread(_remember_postal_codes, key, data)
+    return data
+
+
+@staged("plz")
 def _resolve_plz_inputs(area: str) -> List[str]:
     area = (area or "").strip()
     if "," in area or area.isdigit():
-        return [p.strip() for p in area.split(",") if p.strip()]
+        return _split_plz_list(area)
     pcs = get_postal_codes(area)
     return [e.get("postalCode") for e in pcs if e.get("postalCode")]
+
+
+@staged("plz")
+async def _aresolve_plz_inputs(area: str) -> List[str]:
+    area = (area or "").strip()
+    if "," in area or area.isdigit():
+        return _split_plz_list(area)
+    pcs = await aget_postal_codes(area)
+    return [e.get("postalCode") for e in pcs if e.get("postalCode")]
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+from ..config import RATE_LIMIT_RPS, RATE_LIMIT_BURST
+
+
+class TokenBucket:
+    """Thread-safe token bucket usable from sync code and from the event loop.
+
+    Callers reserve a token under the lock and then sleep outside of it, so
+    waiting never blocks other callers from computing their own slot.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1.0
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def aacquire(self) -> None:
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def bucket_for(url: str) -> TokenBucket:
+    host = (urlsplit(url).hostname or "").lower()
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get(host)
+        if bucket is None:
+            bucket = TokenBucket(RATE_LIMIT_RPS, RATE_LIMIT_BURST)
+            _BUCKETS[host] = bucket
+        return bucket
+
+
+def acquire(url: str) -> None:
+    bucket_for(url).acquire()
+
+
+async def aacquire(url: str) -> None:
+    await bucket_for(url).aacquire()
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls from threads into one execution.
+
+    The first caller for a key runs ``fn``; callers arriving while it is in
+    flight block on its Future and get the same result or exception. The
+    key is released as soon as the call finishes, so nothing is cached.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return ``(result, shared)``; ``shared`` is True for followers."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+        if not leader:
+            return fut.result(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+
+class AsyncSingleFlight:
+    """Event-loop counterpart of ``SingleFlight``.
+
+    The call runs in its own task, so a cancelled caller does not abort the
+    request the other waiters depend on. Keys are scoped to the running
+    loop.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+    async def do(
+        self, key: Hashable, fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        loop_key = (id(asyncio.get_running_loop()), key)
+        task = self._inflight.get(loop_key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(fn())
+            self._inflight[loop_key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(loop_key, None))
+        return await asyncio.shield(task), shared
+
+    def __len__(self) -> int:
+        return len(self._inflight)
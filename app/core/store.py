@@ -0,0 +1,240 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from ..config import SYNC_DB_PATH
+
+
+def _iso_day(date_label: Optional[str]) -> Optional[str]:
+    try:
+        return (
+            datetime.strptime((date_label or "").strip(), "%d.%m.%Y").date().isoformat()
+        )
+    except ValueError:
+        return None
+
+
+def _store_key(m: Dict) -> str:
+    # same identity as the calendar dedup: game_id, else the visible row
+    if m.get("game_id"):
+        return m["game_id"]
+    parts = (m.get("date_label"), m.get("time"), m.get("home"), m.get("away"))
+    return "row:" + "|".join(p or "" for p in parts)
+
+
+class MatchStore:
+    """Local SQLite copy of the area calendars, kept current by the sync.
+
+    Matches are upserted by ``game_id`` and linked to every PLZ they were
+    listed under; ``windows`` records when each (PLZ, window) was last
+    synced, which is what coverage and staleness are derived from.
+    """
+
+    _SCHEMA = (
+        """
+        CREATE TABLE IF NOT EXISTS matches (
+            key TEXT PRIMARY KEY,
+            match_date TEXT NOT NULL,
+            match_time TEXT,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS matches_date ON matches (match_date)",
+        """
+        CREATE TABLE IF NOT EXISTS match_plz (
+            key TEXT NOT NULL,
+            plz TEXT NOT NULL,
+            match_date TEXT NOT NULL,
+            PRIMARY KEY (plz, match_date, key)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS windows (
+            plz TEXT NOT NULL,
+            date_from TEXT NOT NULL,
+            date_to TEXT NOT NULL,
+            synced_at REAL NOT NULL,
+            PRIMARY KEY (plz, date_from, date_to)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS sync_lease (
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID
+        """,
+    )
+
+    def __init__(self, path: str = SYNC_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        d = os.path.dirname(path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for stmt in self._SCHEMA:
+            conn.execute(stmt)
+        conn.commit()
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def replace_window(
+        self,
+        plz: str,
+        date_from: str,
+        date_to: str,
+        matches: Iterable[Dict],
+        synced_at: Optional[float] = None,
+    ) -> int:
+        """Upsert one synced window and drop PLZ links that vanished from it."""
+        synced_at = time.time() if synced_at is None else synced_at
+        rows = []
+        for m in matches:
+            key = _store_key(m)
+            day = _iso_day(m.get("date_label"))
+            if day is None or not (date_from <= day <= date_to):
+                continue
+            data = {k: v for k, v in m.items() if k != "plzs"}
+            rows.append((key, day, m.get("time"), json.dumps(data, ensure_ascii=False)))
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM match_plz WHERE plz = ? AND match_date BETWEEN ? AND ?",
+                (plz, date_from, date_to),
+            )
+            conn.executemany(
+                "INSERT INTO matches (key, match_date, match_time, data, updated_at)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET"
+                " match_date = excluded.match_date, match_time = excluded.match_time,"
+                " data = excluded.data, updated_at = excluded.updated_at",
+                [(k, d, t, data, synced_at) for k, d, t, data in rows],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO match_plz (key, plz, match_date) VALUES (?, ?, ?)",
+                [(k, plz, d) for k, d, _, _ in rows],
+            )
+            conn.execute(
+                "DELETE FROM matches WHERE match_date BETWEEN ? AND ? AND key NOT IN"
+                " (SELECT key FROM match_plz)",
+                (date_from, date_to),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO windows (plz, date_from, date_to, synced_at)"
+                " VALUES (?, ?, ?, ?)",
+                (plz, date_from, date_to, synced_at),
+            )
+        return len(rows)
+
+    def acquire_lease(
+        self, owner: str, ttl: float, now: Optional[float] = None, name: str = "sync"
+    ) -> bool:
+        """Take or renew the lease ``name``; False while another owner holds it.
+
+        Every process sharing the store file competes for the same row, so
+        with several workers only one of them syncs at a time.
+        """
+        now = time.time() if now is None else now
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO sync_lease (name, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(name) DO UPDATE SET owner = excluded.owner,"
+                " expires_at = excluded.expires_at"
+                " WHERE sync_lease.owner = excluded.owner OR sync_lease.expires_at <= ?",
+                (name, owner, now + ttl, now),
+            )
+            row = conn.execute(
+                "SELECT owner FROM sync_lease WHERE name = ?", (name,)
+            ).fetchone()
+        return row is not None and row[0] == owner
+
+    def release_lease(self, owner: str, name: str = "sync") -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "DELETE FROM sync_lease WHERE name = ? AND owner = ?", (name, owner)
+            )
+
+    def synced_at(self, plz: str, date_from: str, date_to: str) -> Optional[float]:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT synced_at FROM windows"
+                " WHERE plz = ? AND date_from = ? AND date_to = ?",
+                (plz, date_from, date_to),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def oldest_sync(
+        self, plzs: List[str], windows: List[Tuple[str, str]]
+    ) -> Optional[float]:
+        """Oldest sync time over all (PLZ, window) pairs, None if one is missing."""
+        oldest = None
+        for plz in plzs:
+            for wf, wt in windows:
+                ts = self.synced_at(plz, wf, wt)
+                if ts is None:
+                    return None
+                oldest = ts if oldest is None else min(oldest, ts)
+        return oldest
+
+    def query(self, plzs: List[str], date_from: str, date_to: str) -> List[Dict]:
+        """Matches of the PLZs in the range, with ``plzs`` in request order."""
+        if not plzs:
+            return []
+        marks = ",".join("?" * len(plzs))
+        rows = (
+            self._conn()
+            .execute(
+                f"SELECT m.key, m.data, l.plz FROM match_plz l"
+                f" JOIN matches m ON m.key = l.key"
+                f" WHERE l.plz IN ({marks}) AND l.match_date BETWEEN ? AND ?"
+                f" ORDER BY m.match_date, m.match_time, m.key",
+                (*plzs, date_from, date_to),
+            )
+            .fetchall()
+        )
+        rank = {plz: i for i, plz in enumerate(plzs)}
+        by_key: Dict[str, Dict] = {}
+        for key, data, plz in rows:
+            m = by_key.get(key)
+            if m is None:
+                m = by_key[key] = json.loads(data)
+                m["plzs"] = []
+            m["plzs"].append(plz)
+        for m in by_key.values():
+            m["plzs"].sort(key=rank.__getitem__)
+        return list(by_key.values())
+
+
+_STORE: Optional[MatchStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store() -> MatchStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = MatchStore()
+        return _STORE
+
+
+def set_store(store: Optional[MatchStore]) -> None:
+    global _STORE
+    with _STORE_LOCK:
+        _STORE = store
@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+from ..config import (
+    CALENDAR_WINDOW,
+    SYNC_PLZS,
+    SYNC_PAST_DAYS,
+    SYNC_FUTURE_DAYS,
+    SYNC_NEAR_DAYS,
+    SYNC_NEAR_INTERVAL,
+    SYNC_FAR_INTERVAL,
+    SYNC_TICK_SEC,
+    SYNC_MAX_STALE,
+    SYNC_LEASE_TTL,
+)
+from .calendar import calendar_windows, iter_matches_for_plz
+from .postal import _split_plz_list
+from .store import MatchStore, get_store
+
+log = logging.getLogger(__name__)
+
+# The store is synced in the same windows the live path fetches, so a
+# request range maps onto stored windows one to one.
+# "auto" syncs whole weeks: the store answers single days from them as well
+SYNC_GRANULARITY = CALENDAR_WINDOW if CALENDAR_WINDOW in ("day", "week") else "week"
+
+
+def sync_plzs() -> List[str]:
+    return _split_plz_list(SYNC_PLZS)
+
+
+def sync_windows(today: Optional[date] = None) -> List[Tuple[str, str, float]]:
+    """Windows of the rolling horizon with their refresh interval."""
+    today = today or date.today()
+    start = today - timedelta(days=SYNC_PAST_DAYS)
+    end = today + timedelta(days=SYNC_FUTURE_DAYS)
+    near_from = (today - timedelta(days=SYNC_NEAR_DAYS)).isoformat()
+    near_to = (today + timedelta(days=SYNC_NEAR_DAYS)).isoformat()
+    out = []
+    for wf, wt in calendar_windows(
+        start.isoformat(), end.isoformat(), SYNC_GRANULARITY
+    ):
+        near = wf <= near_to and wt >= near_from
+        out.append((wf, wt, SYNC_NEAR_INTERVAL if near else SYNC_FAR_INTERVAL))
+    return out
+
+
+def due_jobs(
+    store: MatchStore,
+    plzs: List[str],
+    now: Optional[float] = None,
+    today: Optional[date] = None,
+) -> List[Tuple[str, str, str]]:
+    """(PLZ, window) pairs whose refresh interval has passed, most overdue first."""
+    now = time.time() if now is None else now
+    due = []
+    for wf, wt, interval in sync_windows(today):
+        for plz in plzs:
+            synced_at = store.synced_at(plz, wf, wt)
+            overdue = (
+                now - synced_at - interval if synced_at is not None else float("inf")
+            )
+            if overdue >= 0:
+                due.append((overdue, plz, wf, wt))
+    due.sort(key=lambda d: -d[0])
+    return [(plz, wf, wt) for _, plz, wf, wt in due]
+
+
+def sync_window(store: MatchStore, plz: str, date_from: str, date_to: str) -> int:
+    # bypass the page cache: the sync is what keeps the store fresh
+    matches = list(
+        iter_matches_for_plz(plz, date_from, date_to, page_size=50, use_cache=False)
+    )
+    return store.replace_window(plz, date_from, date_to, matches)
+
+
+def run_sync_once(
+    store: Optional[MatchStore] = None,
+    plzs: Optional[List[str]] = None,
+    owner: Optional[str] = None,
+) -> int:
+    """Sync every due window once; returns the number of windows synced.
+
+    With an ``owner`` the store's sync lease is taken first and renewed
+    before every window; nothing is synced while another process holds it.
+    """
+    store = store or get_store()
+    plzs = sync_plzs() if plzs is None else plzs
+    synced = 0
+    for plz, wf, wt in due_jobs(store, plzs):
+        if owner is not None and not store.acquire_lease(owner, SYNC_LEASE_TTL):
+            break
+        try:
+            sync_window(store, plz, wf, wt)
+            synced += 1
+        except Exception:
+            # retried on the next tick, the other windows still go through
+            log.warning("sync of %s %s..%s failed", plz, wf, wt, exc_info=True)
+    return synced
+
+
+class SyncService:
+    """Runs ``run_sync_once`` every ``tick`` seconds next to the API.
+
+    Every uvicorn/gunicorn worker starts one; the store's sync lease makes
+    sure only one of them talks to upstream at a time.
+    """
+
+    def __init__(
+        self,
+        store: Optional[MatchStore] = None,
+        plzs: Optional[List[str]] = None,
+        tick: float = SYNC_TICK_SEC,
+    ):
+        self.store = store
+        self.plzs = plzs
+        self.tick = tick
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            # scraping and parsing are blocking, keep them off the event loop
+            await asyncio.to_thread(run_sync_once, self.store, self.plzs, self.owner)
+            await asyncio.sleep(self.tick)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        # hand the lease over right away instead of after SYNC_LEASE_TTL
+        store = self.store or get_store()
+        await asyncio.to_thread(store.release_lease, self.owner)
+
+
+@dataclass
+class StoreAnswer:
+    matches: List[Dict]
+    synced_at: float
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.synced_at)
+
+
+async def aquery_store(
+    date_from: str, date_to: str, plzs: List[str], store: Optional[MatchStore] = None
+) -> Optional[StoreAnswer]:
+    """Answer a query for resolved PLZs from the store, or None if not covered.
+
+    Covered means every PLZ is synced, every window of the range has been
+    synced at least once and the oldest one is within ``SYNC_MAX_STALE``.
+    The caller resolves the area, so resolution errors keep their status.
+    """
+    synced = set(sync_plzs())
+    if not plzs or not set(plzs) <= synced:
+        return None
+    # SQLite reads (with a busy timeout) must not block the event loop
+    return await asyncio.to_thread(_read_store, store, plzs, date_from, date_to)
+
+
+def _read_store(
+    store: Optional[MatchStore], plzs: List[str], date_from: str, date_to: str
+) -> Optional[StoreAnswer]:
+    store = store or get_store()
+    windows = calendar_windows(date_from, date_to, SYNC_GRANULARITY)
+    oldest = store.oldest_sync(plzs, windows)
+    if oldest is None:
+        return None
+    if SYNC_MAX_STALE is not None and time.time() - oldest > SYNC_MAX_STALE:
+        return None
+    return StoreAnswer(store.query(plzs, date_from, date_to), oldest)
@@ -0,0 +1,206 @@
+"""Per-request stage timings (Server-Timing) and opt-in cProfile sampling.
+
+A ``RequestTimings`` collector is bound to the request through a context
+variable, so it follows the request into ``asyncio.to_thread`` and the
+threadpool of sync endpoints. Outside a request ``stage()`` is a no-op.
+Stages can overlap (parallel fetches, parse includes obfuscation), so
+their sums may exceed the total.
+"""
+
+import asyncio
+import cProfile
+import functools
+import hmac
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from ..config import PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_TOKEN
+
+_CURRENT: ContextVar[Optional["RequestTimings"]] = ContextVar(
+    "request_timings", default=None
+)
+
+# The event loop thread is shared by all requests: only one request per
+# process is profiled at a time.
+_PROFILE_LOCK = threading.Lock()
+_PROFILING = threading.local()
+# Before 3.12 cProfile hooks only the thread that enables it, so worker
+# threads need a profiler of their own. From 3.12 on it uses sys.monitoring:
+# the loop thread's profiler already sees every thread, and a second one
+# fails with "Another profiling tool is already active".
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+_DESCRIPTIONS = {
+    "plz": "PLZ resolution",
+    "upstream": "upstream requests incl. rate limit",
+    "ratelimit": "rate-limit waits",
+    "cache": "cache reads/writes",
+    "parse": "HTML parsing",
+    "obf": "obfuscation maps/decoding",
+    "endpoint": "endpoint",
+    "validate": "response validation/serialization",
+    "total": "total",
+}
+
+
+class RequestTimings:
+    def __init__(self, profile: bool = False):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}
+        self.profile = profile
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._loop_profile: Optional[cProfile.Profile] = None
+        if profile:
+            self._loop_profile = cProfile.Profile()
+            _PROFILING.active = True
+            self._loop_profile.enable()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            item = self.stages.setdefault(name, [0.0, 0])
+            item[0] += seconds
+            item[1] += 1
+
+    def header(self) -> str:
+        """``Server-Timing`` value; durations in milliseconds."""
+        stages = dict(self.stages)
+        route = stages.pop("route", None)
+        if route and "endpoint" in stages:
+            # FastAPI validates and serializes after the endpoint returns
+            stages["validate"] = [max(0.0, route[0] - stages["endpoint"][0]), 1]
+        stages["total"] = [time.perf_counter() - self.start, 1]
+        parts = []
+        for name, (seconds, count) in stages.items():
+            desc = _DESCRIPTIONS.get(name, name)
+            if count > 1:
+                desc = f"{desc} ({count}x)"
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{desc}"')
+        return ", ".join(parts)
+
+    def stop_profile(self) -> Optional[pstats.Stats]:
+        if self._loop_profile is None:
+            return None
+        self._loop_profile.disable()
+        _PROFILING.active = False
+        with self._lock:
+            profiles = [self._loop_profile, *self.profiles]
+            self._loop_profile = None
+            self.profile = False
+        stats = pstats.Stats(profiles[0])
+        for p in profiles[1:]:
+            stats.add(p)
+        return stats
+
+
+class _Stage:
+    __slots__ = ("_timings", "_name", "_start", "_profile")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self._timings = timings
+        self._name = name
+
+    def __enter__(self) -> "_Stage":
+        self._profile = None
+        if (
+            _PER_THREAD_PROFILES
+            and self._timings.profile
+            and not getattr(_PROFILING, "active", False)
+        ):
+            # work in worker threads is profiled per outermost stage
+            self._profile = cProfile.Profile()
+            _PROFILING.active = True
+            self._profile.enable()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._timings.add(self._name, time.perf_counter() - self._start)
+        if self._profile is not None:
+            self._profile.disable()
+            _PROFILING.active = False
+            with self._timings._lock:
+                if self._timings.profile:
+                    self._timings.profiles.append(self._profile)
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """Time a block as stage ``name`` of the current request, if any."""
+    timings = _CURRENT.get()
+    return _NO_STAGE if timings is None else _Stage(timings, name)
+
+
+def staged(name: str) -> Callable:
+    """Decorator form of ``stage`` for sync and async functions."""
+
+    def wrap(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def ainner(*args, **kwargs):
+                with stage(name):
+                    return await fn(*args, **kwargs)
+
+            return ainner
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+
+        return inner
+
+    return wrap
+
+
+def wants_profile(token: Optional[str]) -> bool:
+    if (
+        PROFILE_TOKEN
+        and token
+        and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+    ):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def begin_request(profile: bool = False):
+    """Bind a new collector to the current context; returns (timings, token)."""
+    if profile and not _PROFILE_LOCK.acquire(blocking=False):
+        profile = False
+    timings = RequestTimings(profile)
+    return timings, _CURRENT.set(timings)
+
+
+def end_request(timings: RequestTimings, token, label: str = "") -> Optional[str]:
+    """Unbind the collector; returns the pstats dump file name if profiled."""
+    _CURRENT.reset(token)
+    if timings._loop_profile is None:
+        return None
+    try:
+        stats = timings.stop_profile()
+    finally:
+        _PROFILE_LOCK.release()
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", label).strip("_") or "request"
+    name = f"{int(time.time() * 1000)}-{os.getpid()}-{slug}.pstats"
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stats.dump_stats(os.path.join(PROFILE_DIR, name))
+    return name
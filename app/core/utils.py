@@ -1,14 +1,34 @@
 import os
 import re
 from urllib.parse import urljoin
-from ..config import BASE, CACHE_DIR
+from bs4 import BeautifulSoup
+from ..config import BASE, CACHE_DIR, HTML_PARSER
+
+try:
+    import lxml  # noqa: F401
+
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False  # optional, falls back to the stdlib parser
+
+
+def _resolve_html_parser(name: str) -> str:
+    if name in ("auto", "lxml") and _HAS_LXML:
+        return "lxml"
+    return "html.parser"
+
+
+# BeautifulSoup tree builder used for all calendar and match parsing
+HTML_PARSER_BACKEND: str = _resolve_html_parser(HTML_PARSER)
+
+
+def make_soup(html: str) -> BeautifulSoup:
+    return BeautifulSoup(html or "", HTML_PARSER_BACKEND)
 
 
 def cache_path_for(category: str, key: str, base_dir: str = CACHE_DIR) -> str:
     safe = re.sub(r"[^\w\.-]+", "_", key).strip("_")
-    d = os.path.join(base_dir, category)
-    os.makedirs(d, exist_ok=True)
-    return os.path.join(d, safe)
+    return os.path.join(base_dir, category, safe)
 
 
 def abs_url(u: str) -> str:
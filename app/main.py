@@ -1,17 +1,62 @@
-from typing import List
-from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import RedirectResponse
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Union
+from fastapi import FastAPI, Query, HTTPException, Header, Request, Response
+from fastapi.routing import APIRoute
+from fastapi.responses import RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware  # 👈 You need this import!
 
-from .schemas import MatchOverview, PostalCode, MatchDetail
-from .core.postal import get_postal_codes
-from .core.calendar import collect_matches_for_area
-from .core.match import fetch_match_full
+from .schemas import (
+    MatchOverview,
+    PostalCode,
+    MatchDetail,
+    MatchDetailsRequest,
+    MatchDetailsItem,
+)
+from .core.postal import get_postal_codes, _aresolve_plz_inputs
+from .core.calendar import acollect_matches_for_plzs, astream_matches_for_area
+from .core.match import fetch_match_full, aiter_match_full_many
+from .core.enrich import aenrich_matches, aenrich_match_list
+from .core.http import aclose_async_client
+from .core.sync import StoreAnswer, SyncService, aquery_store, sync_plzs
+from .core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_latest
+from .core.timing import begin_request, end_request, stage, staged, wants_profile
+from .config import SERVER_TIMING, PROFILE_SAMPLE_RATE, PROFILE_TOKEN
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    sync = SyncService() if sync_plzs() else None
+    if sync is not None:
+        sync.start()
+    yield
+    if sync is not None:
+        await sync.stop()
+    await aclose_async_client()
+
+
+class TimedRoute(APIRoute):
+    """Times the endpoint and the whole route (incl. response validation)."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, staged("endpoint")(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request):
+            with stage("route"):
+                return await handler(request)
+
+        return timed_handler
+
 
 app = FastAPI(
     title="Fussball.de Matchkalender Scraper API (inoffiziell)",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
+app.router.route_class = TimedRoute
 
 # ✅ CORS Middleware — allows access from anywhere
 app.add_middleware(
@@ -22,6 +67,22 @@ app.add_middleware(
     allow_headers=["*"],          # Allow all headers
 )
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    if not (SERVER_TIMING or PROFILE_SAMPLE_RATE > 0 or PROFILE_TOKEN):
+        return await call_next(request)
+    timings, token = begin_request(wants_profile(request.headers.get("x-profile")))
+    try:
+        response = await call_next(request)
+    finally:
+        dump = end_request(timings, token, request.url.path)
+    if SERVER_TIMING:
+        # streamed responses: covers the time until the body starts
+        response.headers["Server-Timing"] = timings.header()
+    if dump:
+        response.headers["X-Profile-Dump"] = dump
+    return response
+
 @app.get("/", include_in_schema=False)
 async def root():
     return RedirectResponse(url="/docs")
@@ -34,27 +95,125 @@ def postal_codes(
 ):
     return get_postal_codes(query)
 
-@app.get("/matches", response_model=List[MatchOverview], response_model_exclude_none=True)
-def matches(
+def _to_overview(m: dict) -> dict:
+    return {
+        "date_label": m.get("date_label"),
+        "time": m.get("time"),
+        "age_group": m.get("age_group"),
+        "league": m.get("league"),
+        "home": m.get("home"),
+        "away": m.get("away"),
+        "score": m.get("score"),
+        "game_id": m.get("game_id"),
+        "link": m.get("link"),
+        "plzs": m.get("plzs"),
+    }
+
+def _source_headers(answer: Optional[StoreAnswer]) -> Dict[str, str]:
+    if answer is None:
+        return {"X-Data-Source": "live"}
+    synced = datetime.fromtimestamp(answer.synced_at, timezone.utc)
+    return {
+        "X-Data-Source": "store",
+        "X-Data-Synced-At": synced.isoformat(timespec="seconds"),
+        "X-Data-Age": str(int(answer.age)),
+    }
+
+async def _aiter_list(items: List[dict]):
+    for m in items:
+        yield m
+
+async def _aprepend(first: dict, rows):
+    yield first
+    async for m in rows:
+        yield m
+
+async def _aresolve_area(area: str) -> List[str]:
+    # Shared by the stream and list paths of /matches: both answer a bad
+    # area with the same 404/422 and an upstream failure with 502.
+    try:
+        plzs = await _aresolve_plz_inputs(area)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail="PLZ-Suche upstream fehlgeschlagen") from e
+    if not plzs:
+        raise HTTPException(status_code=404, detail="Keine PLZ für dieses Gebiet gefunden")
+    invalid = [p for p in plzs if not (len(p) == 5 and p.isdigit())]
+    if invalid:
+        raise HTTPException(status_code=422, detail=f"Ungültige PLZ: {', '.join(invalid)}")
+    return plzs
+
+async def _aopen_area_stream(from_: str, to: str, plzs: List[str]):
+    # The first calendar page is awaited here, so it can still fail with a
+    # proper status before StreamingResponse has sent its 200.
+    rows = astream_matches_for_area(from_, to, plzs)
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        return _aiter_list([])
+    except Exception as e:
+        raise HTTPException(status_code=502, detail="Spielkalender upstream nicht abrufbar") from e
+    return _aprepend(first, rows)
+
+async def _ndjson_matches(rows, enrich: bool = False):
+    if enrich:
+        async for m in aenrich_matches(rows):
+            item = MatchDetail(**m)
+            yield item.model_dump_json(exclude_none=True) + "\n"
+        return
+    async for m in rows:
+        item = MatchOverview(**_to_overview(m))
+        yield item.model_dump_json(exclude_none=True) + "\n"
+
+@app.get(
+    "/matches",
+    response_model=List[Union[MatchDetail, MatchOverview]],
+    response_model_exclude_none=True,
+)
+async def matches(
+    response: Response,
     from_: str = Query(..., alias="from", description="YYYY-MM-DD"),
     to: str = Query(..., description="YYYY-MM-DD"),
     area: str = Query(description="Ort oder kommaseparierte PLZs"),
+    stream: bool = Query(
+        False,
+        description="Spiele als NDJSON streamen, sobald sie geparst sind "
+        "(alternativ `Accept: application/x-ndjson`)",
+    ),
+    enrich: bool = Query(
+        False,
+        description="Jede Zeile um Match-Details (Spielort, SR, Wettbewerb) ergänzen",
+    ),
+    accept: str = Header("", include_in_schema=False),
 ):
-    items = collect_matches_for_area(from_, to, area)
-    return [
-        {
-            "date_label": m.get("date_label"),
-            "time": m.get("time"),
-            "age_group": m.get("age_group"),
-            "league": m.get("league"),
-            "home": m.get("home"),
-            "away": m.get("away"),
-            "score": m.get("score"),
-            "game_id": m.get("game_id"),
-            "link": m.get("link"),
-        }
-        for m in items
-    ]
+    # Resolve once: the store lookup and both live paths share the PLZs
+    # and their 404/422/502 mapping.
+    plzs = await _aresolve_area(area)
+    # Synced PLZs are answered from the local store (see X-Data-* headers)
+    answer = await aquery_store(from_, to, plzs)
+    headers = _source_headers(answer)
+    if stream or "application/x-ndjson" in accept:
+        rows = (
+            _aiter_list(answer.matches)
+            if answer is not None
+            else await _aopen_area_stream(from_, to, plzs)
+        )
+        return StreamingResponse(
+            _ndjson_matches(rows, enrich),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+    response.headers.update(headers)
+    if answer is not None:
+        items = answer.matches
+    else:
+        try:
+            items = await acollect_matches_for_plzs(from_, to, plzs)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail="Spielkalender upstream nicht abrufbar") from e
+    if enrich:
+        items = await aenrich_match_list(items)
+        return [MatchDetail(**m) for m in items]
+    return [_to_overview(m) for m in items]
 
 @app.get("/match", response_model=MatchDetail, response_model_exclude_none=True)
 def match_by_link(
@@ -64,3 +223,40 @@ def match_by_link(
     if not m:
         raise HTTPException(status_code=404, detail="Match nicht gefunden oder lesbar")
     return m
+
+def _details_item(items: List[str], i: int, m, error) -> MatchDetailsItem:
+    return MatchDetailsItem(
+        index=i, input=items[i], match=MatchDetail(**m) if m else None, error=error
+    )
+
+async def _ndjson_details(items: List[str]):
+    async for i, m, error in aiter_match_full_many(items):
+        item = _details_item(items, i, m, error)
+        yield item.model_dump_json(exclude_none=True) + "\n"
+
+@app.post(
+    "/matches/details",
+    response_model=List[MatchDetailsItem],
+    response_model_exclude_none=True,
+)
+async def match_details_batch(
+    body: MatchDetailsRequest,
+    stream: bool = Query(
+        False,
+        description="Ergebnisse als NDJSON in Fertigstellungs-Reihenfolge streamen "
+        "(alternativ `Accept: application/x-ndjson`)",
+    ),
+    accept: str = Header("", include_in_schema=False),
+):
+    if stream or "application/x-ndjson" in accept:
+        return StreamingResponse(
+            _ndjson_details(body.items), media_type="application/x-ndjson"
+        )
+    results: List[MatchDetailsItem] = [None] * len(body.items)
+    async for i, m, error in aiter_match_full_many(body.items):
+        results[i] = _details_item(body.items, i, m, error)
+    return results
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(render_latest(), media_type=METRICS_CONTENT_TYPE)
@@ -1,5 +1,7 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+from .config import MATCH_BATCH_MAX
 
 
 class PostalCode(BaseModel):
@@ -18,6 +20,7 @@ class MatchOverview(BaseModel):
     score: Optional[str] = None
     game_id: Optional[str] = None
     link: Optional[str] = None
+    plzs: Optional[List[str]] = None
 
 
 class MatchDetail(MatchOverview):
@@ -30,3 +33,19 @@ class MatchDetail(MatchOverview):
     referee: Optional[str] = None
     assistant_1: Optional[str] = None
     assistant_2: Optional[str] = None
+
+
+class MatchDetailsRequest(BaseModel):
+    items: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MATCH_BATCH_MAX,
+        description="Match-Links (absolut oder relativ) oder game_ids",
+    )
+
+
+class MatchDetailsItem(BaseModel):
+    index: int
+    input: str
+    match: Optional[MatchDetail] = None
+    error: Optional[str] = None
@@ -0,0 +1,113 @@
+"""Microbenchmark for the obfuscation decoder.
+
+Decodes every obfuscated element of the synthetic match page fixture (date,
+score, referee, assistants) with the map from the obfuscation CSS fixture.
+The fixtures are hand-built to mirror fussball.de's markup, not captured
+from the site.
+
+``reference_decode_all_obf_in`` is the decoder as it was before the
+``str.translate`` rewrite (ancestor walk per text node, per-character map,
+a BeautifulSoup per fragment); it is timed on the same elements for a
+before/after comparison.
+
+    python -m benchmarks.bench_obfuscation
+"""
+
+import re
+import timeit
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from app.core.obfuscation import (
+    _ENTITY_HEX_RX,
+    _build_obfuscation_map_from_css,
+    _find_ancestor_obf_id,
+    decode_all_obf_in,
+)
+from app.core.utils import make_soup
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+SELECTORS = [
+    ".stage .stage-header .date-wrapper .date",
+    ".stage .result .end-result",
+    ".stage-meta-left li.row",
+    ".stage-meta-left li.row span",
+]
+
+
+def load_elements() -> Tuple[List, Dict[str, Dict[int, str]]]:
+    """Obfuscated elements of the match page fixture and the page's maps."""
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    html = (FIXTURES / "match_page.html").read_text("utf-8")
+    page_maps = {"q3mmfkvk": _build_obfuscation_map_from_css(css)}
+    soup = make_soup(html)
+    return [el for sel in SELECTORS for el in soup.select(sel)], page_maps
+
+
+def _reference_decode_text(raw_html_or_text: str, obf_map: Dict[int, str]) -> str:
+    if not raw_html_or_text:
+        return ""
+
+    def _ent_repl(m):
+        cp = int(m.group(1), 16)
+        return obf_map.get(cp, "?")
+
+    s = _ENTITY_HEX_RX.sub(_ent_repl, raw_html_or_text)
+
+    def _map_chars(txt: str) -> str:
+        if not any(0xE000 <= ord(c) <= 0xF8FF for c in txt):
+            return txt
+        return "".join(obf_map.get(ord(c), c) for c in txt)
+
+    s = _map_chars(s)
+    s = make_soup(s).get_text(" ", strip=True)
+
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def reference_decode_all_obf_in(el, page_maps: Dict[str, Dict[int, str]]) -> str:
+    pieces: List[str] = []
+    for txt in el.strings:
+        obf_id = _find_ancestor_obf_id(txt)
+        if obf_id and (page_maps.get(obf_id) or {}):
+            pieces.append(_reference_decode_text(str(txt), page_maps[obf_id]))
+        else:
+            pieces.append(str(txt))
+    return re.sub(r"\s+", " ", "".join(pieces)).strip()
+
+
+def decode_elements(
+    elements: List,
+    page_maps: Dict[str, Dict[int, str]],
+    decode: Callable = decode_all_obf_in,
+) -> None:
+    for el in elements:
+        decode(el, page_maps)
+
+
+def _per_element(decode: Callable, elements, page_maps, number: int) -> float:
+    best = min(
+        timeit.repeat(
+            lambda: decode_elements(elements, page_maps, decode),
+            number=number,
+            repeat=5,
+        )
+    )
+    return best / number / len(elements)
+
+
+def main(number: int = 2000) -> None:
+    elements, page_maps = load_elements()
+    before = _per_element(reference_decode_all_obf_in, elements, page_maps, number)
+    after = _per_element(decode_all_obf_in, elements, page_maps, number)
+    print(f"{len(elements)} elements")
+    for name, per_el in (("before", before), ("after", after)):
+        print(
+            f"{name:<7} {per_el * 1e6:7.1f} us/element, {1 / per_el:>9,.0f} elements/s"
+        )
+    print(f"speedup {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
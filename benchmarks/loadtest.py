@@ -0,0 +1,159 @@
+"""Load generator for the API, meant to run against the mock upstream.
+
+Sends requests from ``--concurrency`` workers until ``--requests`` are
+done (or ``--duration`` seconds passed) and reports throughput and
+p50/p90/p99 latency per path template and overall.
+
+    python -m benchmarks.mock_upstream --port 8001 --latency-ms 80 &
+    FBDE_BASE=http://127.0.0.1:8001 RATE_LIMIT_RPS=0 uvicorn app.main:app &
+    python -m benchmarks.loadtest --concurrency 32 --requests 2000
+
+``{n}`` in a path is replaced by a random number below ``--keyspace`` (to
+mix cache hits and misses), ``{today}`` and ``{week}`` by ISO dates.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/matches?from={today}&to={week}&area=20095,20096",
+    "/matches?from={today}&to={week}&area=Hamburg",
+    "/match?link=/spiel/-/spiel/02ULOADTEST{n:021d}",
+    "/postal-codes?query=Ham",
+]
+
+
+@dataclass
+class Stats:
+    # latency of every request that got a response, whatever its status
+    latencies: List[float] = field(default_factory=list)
+    # status >= 400 or no response at all
+    errors: int = 0
+    failed: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.failed
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile of ``values`` (0 < q <= 100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def render_path(template: str, keyspace: int, rng: random.Random) -> str:
+    today = date.today()
+    return template.format(
+        n=rng.randrange(max(1, keyspace)),
+        today=today.isoformat(),
+        week=(today + timedelta(days=6)).isoformat(),
+    )
+
+
+async def run(
+    base_url: str,
+    paths: List[str],
+    concurrency: int,
+    requests: int,
+    duration: Optional[float],
+    keyspace: int,
+    timeout: float,
+    seed: Optional[int] = None,
+) -> Dict[str, Stats]:
+    rng = random.Random(seed)
+    stats: Dict[str, Stats] = defaultdict(Stats)
+    remaining = requests
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        nonlocal remaining
+        while remaining > 0 and (deadline is None or time.perf_counter() < deadline):
+            remaining -= 1
+            template = rng.choice(paths)
+            s = stats[template]
+            start = time.perf_counter()
+            try:
+                r = await client.get(render_path(template, keyspace, rng))
+                await r.aread()
+            except httpx.HTTPError:
+                s.errors += 1
+                s.failed += 1
+                continue
+            s.latencies.append(time.perf_counter() - start)
+            if r.status_code >= 400:
+                s.errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return stats
+
+
+def report(stats: Dict[str, Stats], elapsed: float) -> str:
+    lines = [
+        f"{'path':<56}{'reqs':>7}{'err':>6}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+    ]
+    total = Stats()
+    for template, s in sorted(stats.items()):
+        total.latencies.extend(s.latencies)
+        total.errors += s.errors
+        total.failed += s.failed
+        lines.append(_line(template[:55], s))
+    lines.append(_line("all", total))
+    n = total.requests
+    lines.append(f"\n{n} requests in {elapsed:.1f}s: {n / elapsed:,.1f} req/s")
+    return "\n".join(lines)
+
+
+def _line(name: str, s: Stats) -> str:
+    ms = [v * 1000 for v in s.latencies]
+    return (
+        f"{name:<56}{s.requests:>7}{s.errors:>6}{percentile(ms, 50):>9.1f}"
+        f"{percentile(ms, 90):>9.1f}{percentile(ms, 99):>9.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API load generator")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", help="path template (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--duration", type=float, help="stop after N seconds")
+    parser.add_argument("--keyspace", type=int, default=500)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = asyncio.run(
+        run(
+            args.url,
+            args.path or DEFAULT_PATHS,
+            args.concurrency,
+            args.requests,
+            args.duration,
+            args.keyspace,
+            args.timeout,
+            args.seed,
+        )
+    )
+    print(report(stats, time.perf_counter() - start))
+
+
+if __name__ == "__main__":
+    main()
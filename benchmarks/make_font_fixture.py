@@ -0,0 +1,47 @@
+"""Generate ``tests/fixtures/obfuscation.woff`` from the CSS fixture.
+
+fussball.de serves the same obfuscation map twice, as CSS ``::before``
+rules and as a WOFF font whose cmap points every private-use code point
+at a ``uniXXXX`` glyph of the real character. The font is rebuilt here
+from the CSS fixture, so both fixtures describe the same map.
+
+    python -m benchmarks.make_font_fixture
+"""
+
+from pathlib import Path
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+from app.core.obfuscation import _build_obfuscation_map_from_css
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+
+def build_font(obf_map, family: str = "q3mmfkvk") -> FontBuilder:
+    cmap = {cp: f"uni{ord(ch):04X}" for cp, ch in sorted(obf_map.items())}
+    glyphs = [".notdef", *sorted(set(cmap.values()))]
+    empty = TTGlyphPen(None).glyph()
+
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder(glyphs)
+    fb.setupCharacterMap(cmap)
+    fb.setupGlyf({name: empty for name in glyphs})
+    fb.setupHorizontalMetrics({name: (500, 0) for name in glyphs})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": family, "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.font.flavor = "woff"
+    return fb
+
+
+def main() -> None:
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    out = FIXTURES / "obfuscation.woff"
+    build_font(_build_obfuscation_map_from_css(css)).save(str(out))
+    print(f"wrote {out} ({out.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
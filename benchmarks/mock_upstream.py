@@ -0,0 +1,292 @@
+"""Local stand-in for the fussball.de endpoints the scraper uses.
+
+Serves the calendar ``loadmore`` pagination protocol, match pages with
+obfuscated text, the obfuscation CSS/WOFF and postal-code completions.
+Content is generated deterministically from the synthetic fixtures in
+``tests/fixtures`` (hand-built after fussball.de's markup), so the API
+runs its real parsers on it. Point the API at it with ``FBDE_BASE``:
+
+    python -m benchmarks.mock_upstream --port 8001 --latency-ms 80 --error-rate 0.01
+    FBDE_BASE=http://127.0.0.1:8001 RATE_LIMIT_RPS=0 uvicorn app.main:app
+
+Calendar, match and obfuscation responses carry an ``ETag`` and answer
+``If-None-Match`` with 304, like upstream.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+FIXTURE_GAME_ID = "02U3863ODC000000VS5489BUVS8CK5KT"
+FIXTURE_OBF_ID = "q3mmfkvk"
+WEEKDAYS = [
+    "Montag",
+    "Dienstag",
+    "Mittwoch",
+    "Donnerstag",
+    "Freitag",
+    "Samstag",
+    "Sonntag",
+]
+CITIES = {
+    "Hamburg": 20095,
+    "Hamm": 59063,
+    "Hannover": 30159,
+    "Berlin": 10115,
+    "Bremen": 28195,
+    "Köln": 50667,
+    "München": 80331,
+}
+TEAMS = [
+    "SC Poppenbüttel",
+    "TuS Berne",
+    "TSV Sasel",
+    "Condor",
+    "Walddörfer SV",
+    "Eintracht Norderstedt",
+    "HSV III",
+    "Altona 93",
+]
+LEAGUES = [
+    ("Herren", "Landesliga"),
+    ("D-Junioren", "Regionalliga"),
+    ("B-Mädchen", "Oberliga"),
+    ("C-Junioren", "Bezirksliga"),
+]
+
+
+@dataclass
+class Settings:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    # pages every calendar query returns, each with ``max`` rows
+    pages: int = 3
+    obf_ids: int = 4
+    plzs_per_city: int = 5
+    seed: Optional[int] = None
+
+
+def _digest(*parts: object) -> str:
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest().upper()
+
+
+def game_id_for(*parts: object) -> str:
+    return "02U" + _digest(*parts)[:29]
+
+
+def _obf_id_for(game_id: str, settings: Settings) -> str:
+    n = int(_digest(game_id), 16) % max(1, settings.obf_ids)
+    return f"mock{n:04d}"
+
+
+def _day(s: str) -> date:
+    return datetime.strptime(s, "%Y-%m-%d").date()
+
+
+def calendar_rows(
+    base: str, plz: str, date_from: str, date_to: str, total: int
+) -> List[Dict]:
+    """``total`` matches of one calendar query, spread over its days."""
+    d0, d1 = _day(date_from), _day(date_to)
+    days = max(1, (d1 - d0).days + 1)
+    today = date.today()
+    rows = []
+    for i in range(total):
+        day = d0 + timedelta(days=i * days // total)
+        gid = game_id_for(plz, day.isoformat(), i)
+        h = int(gid[3:11], 16)
+        home = h % len(TEAMS)
+        away = (home + 1 + (h >> 8) % (len(TEAMS) - 1)) % len(TEAMS)
+        age, league = LEAGUES[h % len(LEAGUES)]
+        score = f"{h % 5}:{h // 5 % 4}" if day < today else None
+        rows.append(
+            {
+                "day": day,
+                "time": f"{10 + i % 10:02d}:{(i * 15) % 60:02d}",
+                "age": age,
+                "league": league,
+                "home": TEAMS[home],
+                "away": TEAMS[away],
+                "score": score,
+                "link": f"{base}/spiel/mock/-/spiel/{gid}",
+            }
+        )
+    return rows
+
+
+def _row_html(r: Dict) -> str:
+    if r["score"]:
+        left, right = r["score"].split(":")
+        score = (
+            f'<span class="score-left">{left}</span><span class="colon">:</span>'
+            f'<span class="score-right">{right}</span>'
+        )
+    else:
+        score = '<span class="info-text">Spiel</span>'
+    return (
+        f'<tr class="odd"><td class="column-date">{r["time"]}</td>'
+        f'<td class="column-team">{r["age"]}</td>'
+        f'<td class="column-league">{r["league"]}</td>'
+        f'<td class="column-club"><a class="club-wrapper">'
+        f'<div class="club-name">{r["home"]}</div></a></td>'
+        f'<td class="column-colon">:</td>'
+        f'<td class="column-club no-border"><a class="club-wrapper">'
+        f'<div class="club-name">{r["away"]}</div></a></td>'
+        f'<td class="column-score"><a href="{r["link"]}">{score}</a></td></tr>'
+    )
+
+
+def calendar_page(rows: List[Dict], offset: int, max_results: int) -> Dict:
+    page = rows[offset : offset + max_results]
+    parts, current = [], None
+    for r in page:
+        if r["day"] != current:
+            current = r["day"]
+            label = f"{WEEKDAYS[current.weekday()]}, {current:%d.%m.%Y}"
+            parts.append(
+                f'<tr class="row-headline visible-small">'
+                f'<td colspan="7">{label}</td></tr>'
+            )
+        parts.append(_row_html(r))
+    last_index = offset + len(page) - 1 if page else offset - 1
+    return {
+        "final": last_index >= len(rows) - 1,
+        "lastIndex": last_index,
+        "html": "\n".join(parts),
+    }
+
+
+def postal_completions(query: str, per_city: int) -> List[Dict[str, str]]:
+    q = query.strip().casefold()
+    out = []
+    for city, first in CITIES.items():
+        for k in range(per_city):
+            plz = f"{first + k:05d}"
+            if city.casefold().startswith(q) or plz.startswith(q):
+                out.append(
+                    {"postalCode": plz, "city": city, "district": f"{city}-{k + 1}"}
+                )
+    return out
+
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    settings = settings or Settings()
+    rng = random.Random(settings.seed)
+    match_html = (FIXTURES / "match_page.html").read_text("utf-8")
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    woff = (FIXTURES / "obfuscation.woff").read_bytes()
+
+    app = FastAPI(title="fussball.de mock upstream", openapi_url=None)
+
+    def _base(request: Request) -> str:
+        return str(request.base_url).rstrip("/")
+
+    def _cached(request: Request, body, media_type: str) -> Response:
+        raw = body if isinstance(body, bytes) else body.encode("utf-8")
+        etag = f'"{hashlib.sha1(raw).hexdigest()[:16]}"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"etag": etag})
+        return Response(raw, media_type=media_type, headers={"etag": etag})
+
+    @app.middleware("http")
+    async def latency_and_errors(request: Request, call_next):
+        delay = settings.latency_ms + rng.uniform(
+            -settings.jitter_ms, settings.jitter_ms
+        )
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if settings.error_rate > 0 and rng.random() < settings.error_rate:
+            return Response("mock error", status_code=503)
+        return await call_next(request)
+
+    @app.get(
+        "/ajax.match.calendar.loadmore/-/datum-bis/{date_to}/datum-von/{date_from}"
+        "/mime-type/JSON/plz/{plz}/max/{max_results}/offset/{offset}"
+    )
+    def calendar(
+        request: Request,
+        date_to: str,
+        date_from: str,
+        plz: str,
+        max_results: int,
+        offset: int,
+    ):
+        max_results = max(1, max_results)
+        total = settings.pages * max_results
+        rows = calendar_rows(_base(request), plz, date_from, date_to, total)
+        data = calendar_page(rows, offset, max_results)
+        return _cached(request, json.dumps(data), "application/json")
+
+    @app.get("/spiel/-/spiel/{game_id}")
+    @app.get("/spiel/{slug}/-/spiel/{game_id}")
+    def match_page(request: Request, game_id: str, slug: str = "-"):
+        base = _base(request)
+        host = base.split("://", 1)[-1]
+        html = (
+            match_html.replace("https://www.fussball.de", base)
+            .replace("//www.fussball.de", f"//{host}")
+            .replace(FIXTURE_GAME_ID, game_id)
+            .replace(FIXTURE_OBF_ID, _obf_id_for(game_id, settings))
+        )
+        return _cached(request, html, "text/html; charset=utf-8")
+
+    @app.get("/export.fontface/-/id/{obf_id}/type/css")
+    def obfuscation_css(request: Request, obf_id: str):
+        host = _base(request).split("://", 1)[-1]
+        body = css.replace("//www.fussball.de", f"//{host}").replace(
+            FIXTURE_OBF_ID, obf_id
+        )
+        return _cached(request, body, "text/css")
+
+    @app.get("/export.fontface/-/format/woff/id/{obf_id}/type/font")
+    def obfuscation_font(request: Request, obf_id: str):
+        return _cached(request, woff, "font/woff")
+
+    @app.get("/public.service/-/action/getPostalCodeCompletions/plz/{query}")
+    def postal_codes(query: str):
+        return JSONResponse(postal_completions(query, settings.plzs_per_city))
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="fussball.de mock upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--pages", type=int, default=3)
+    parser.add_argument("--obf-ids", type=int, default=4)
+    parser.add_argument("--plzs-per-city", type=int, default=5)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    settings = Settings(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        pages=args.pages,
+        obf_ids=args.obf_ids,
+        plzs_per_city=args.plzs_per_city,
+        seed=args.seed,
+    )
+    uvicorn.run(
+        create_app(settings), host=args.host, port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
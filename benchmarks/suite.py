@@ -0,0 +1,217 @@
+"""Offline benchmark suite over the synthetic fussball.de fixtures.
+
+Measures throughput (best of several timed runs) and peak memory
+(tracemalloc, one call) of the parsing hot paths, prints a report and
+compares it against ``benchmarks/baseline.json``. Exits with status 1 if
+a case got slower or uses more memory than the baseline allows.
+
+    python -m benchmarks.suite                    # run and compare
+    python -m benchmarks.suite --save-baseline    # record a new baseline
+    python -m benchmarks.suite --threshold 0.1 --only calendar_parse
+
+The fixtures in ``tests/fixtures`` are hand-built to mirror fussball.de's
+markup, not captured from the site. Throughput depends on the machine:
+record the baseline on the host that runs the comparison.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from app.core import obfuscation
+from app.core.calendar import parse_matches
+from app.core.match import _parse_match_page
+from app.core.obfuscation import (
+    _build_obfuscation_map_from_css,
+    _build_obfuscation_map_from_font,
+)
+from benchmarks.bench_obfuscation import decode_elements, load_elements
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ROOT / "tests" / "fixtures"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+MATCH_URL = (
+    "https://www.fussball.de/spiel/condor-1b-maed-walddoerfer-1b-maed"
+    "/-/spiel/02U3863ODC000000VS5489BUVS8CK5KT"
+)
+OBF_ID = "q3mmfkvk"
+
+
+@dataclass
+class Case:
+    name: str
+    fn: Callable[[], object]
+    # work items per call, to report e.g. rows/s next to calls/s
+    units: int
+    unit: str
+
+
+@dataclass
+class Result:
+    name: str
+    ops_per_sec: float
+    units_per_sec: float
+    unit: str
+    peak_kib: float
+
+
+def _fixture(name: str) -> str:
+    return (FIXTURES / name).read_text("utf-8")
+
+
+def build_cases() -> List[Case]:
+    calendar_html = json.loads(_fixture("calendar_page.json"))["html"]
+    match_html = _fixture("match_page.html")
+    woff = (FIXTURES / "obfuscation.woff").read_bytes()
+    obf_map = _build_obfuscation_map_from_css(_fixture("obfuscation.css"))
+
+    # the match page decodes with the fixture map, no upstream requests
+    obfuscation._OBF_CACHE.put(OBF_ID, obf_map, None)
+    elements, page_maps = load_elements()
+
+    return [
+        Case(
+            "calendar_parse",
+            lambda: parse_matches(calendar_html),
+            len(parse_matches(calendar_html)),
+            "rows",
+        ),
+        Case(
+            "match_parse",
+            lambda: _parse_match_page(match_html, MATCH_URL, use_cache=False),
+            1,
+            "pages",
+        ),
+        Case(
+            "font_map",
+            lambda: _build_obfuscation_map_from_font(woff),
+            len(_build_obfuscation_map_from_font(woff)),
+            "glyphs",
+        ),
+        Case(
+            "obf_decode",
+            lambda: decode_elements(elements, page_maps),
+            len(elements),
+            "elements",
+        ),
+    ]
+
+
+def measure(case: Case, repeat: int = 5) -> Result:
+    timer = timeit.Timer(case.fn)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    tracemalloc.start()
+    try:
+        case.fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(case.name, 1 / best, case.units / best, case.unit, peak / 1024)
+
+
+def compare(
+    results: List[Result], baseline: Dict[str, Dict[str, float]], threshold: float
+) -> List[str]:
+    """Regression messages for results worse than ``baseline`` by ``threshold``."""
+    failures = []
+    for r in results:
+        base = baseline.get(r.name)
+        if not base:
+            continue
+        floor = base["ops_per_sec"] * (1 - threshold)
+        if r.ops_per_sec < floor:
+            failures.append(
+                f"{r.name}: {r.ops_per_sec:,.1f} ops/s < {floor:,.1f} "
+                f"(baseline {base['ops_per_sec']:,.1f})"
+            )
+        ceiling = base["peak_kib"] * (1 + threshold)
+        if r.peak_kib > ceiling:
+            failures.append(
+                f"{r.name}: {r.peak_kib:,.1f} KiB peak > {ceiling:,.1f} "
+                f"(baseline {base['peak_kib']:,.1f})"
+            )
+    return failures
+
+
+def _delta(value: float, base: Optional[float]) -> str:
+    return f"{(value / base - 1) * 100:+.1f}%" if base else "-"
+
+
+def report(results: List[Result], baseline: Dict[str, Dict[str, float]]) -> str:
+    lines = [
+        f"{'case':<16}{'ops/s':>12}{'us/op':>12}{'units/s':>20}"
+        f"{'peak KiB':>12}{'d ops/s':>10}{'d mem':>10}"
+    ]
+    for r in results:
+        base = baseline.get(r.name, {})
+        units = f"{r.units_per_sec:,.0f} {r.unit}"
+        lines.append(
+            f"{r.name:<16}{r.ops_per_sec:>12,.1f}{1e6 / r.ops_per_sec:>12,.1f}"
+            f"{units:>20}{r.peak_kib:>12,.1f}"
+            f"{_delta(r.ops_per_sec, base.get('ops_per_sec')):>10}"
+            f"{_delta(r.peak_kib, base.get('peak_kib')):>10}"
+        )
+    return "\n".join(lines)
+
+
+def load_baseline(path: Path = BASELINE) -> Dict[str, Dict[str, float]]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text("utf-8")).get("cases", {})
+
+
+def save_baseline(results: List[Result], path: Path = BASELINE) -> None:
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {
+            r.name: {
+                "ops_per_sec": round(r.ops_per_sec, 2),
+                "peak_kib": round(r.peak_kib, 1),
+            }
+            for r in results
+        },
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n", "utf-8")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown / memory growth (default 0.25)",
+    )
+    parser.add_argument("--only", action="append", help="run only these cases")
+    args = parser.parse_args(argv)
+
+    cases = [c for c in build_cases() if not args.only or c.name in args.only]
+    results = [measure(c) for c in cases]
+    baseline = load_baseline(args.baseline)
+    print(report(results, baseline))
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not baseline:
+        print("no baseline, nothing to compare (use --save-baseline)")
+        return 0
+    failures = compare(results, baseline, args.threshold)
+    for f in failures:
+        print(f"REGRESSION {f}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core import cache, obfuscation
+from app.core.obfuscation import _build_obfuscation_map_from_css
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MATCH_LINK = (
+    "/spiel/condor-1b-maed-walddoerfer-1b-maed/-/spiel/02U3863ODC000000VS5489BUVS8CK5KT"
+)
+
+
+@pytest.fixture(autouse=True)
+def _tmp_cache(tmp_path, monkeypatch):
+    # keep cache writes of the tests out of the working tree's CACHE_DIR
+    backend = cache.FileCacheBackend(str(tmp_path / "cache"))
+    monkeypatch.setattr(cache, "_BACKEND", backend)
+    yield backend
+    backend.flush()
+
+
+@pytest.fixture
+def calendar_html() -> str:
+    return json.loads((FIXTURES / "calendar_page.json").read_text("utf-8"))["html"]
+
+
+@pytest.fixture
+def match_html() -> str:
+    return (FIXTURES / "match_page.html").read_text("utf-8")
+
+
+@pytest.fixture
+def obf_maps(monkeypatch):
+    # the match fixture is obfuscated with the map from obfuscation.css
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    maps = {"q3mmfkvk": _build_obfuscation_map_from_css(css)}
+    store = obfuscation._ObfMapLRU(16)
+    for obf_id, obf_map in maps.items():
+        store.put(obf_id, obf_map, None)
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", store)
+    return maps
@@ -0,0 +1,33 @@
+from benchmarks import suite
+from app.core import obfuscation
+
+
+def _result(name, ops, kib):
+    return suite.Result(name, ops, ops, "x", kib)
+
+
+def test_compare_flags_slowdown_and_memory_growth():
+    baseline = {
+        "a": {"ops_per_sec": 100.0, "peak_kib": 10.0},
+        "b": {"ops_per_sec": 100.0, "peak_kib": 10.0},
+    }
+    results = [_result("a", 80.0, 12.0), _result("b", 70.0, 13.0), _result("c", 1, 1)]
+    failures = suite.compare(results, baseline, threshold=0.25)
+    assert len(failures) == 2
+    assert all(f.startswith("b:") for f in failures)
+
+
+def test_cases_run_on_fixtures(monkeypatch):
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", obfuscation._ObfMapLRU(16))
+    for case in suite.build_cases():
+        assert case.fn() is not None or case.name == "obf_decode"
+        assert case.units > 0
+
+
+def test_reference_decoder_agrees_with_current_one():
+    from benchmarks import bench_obfuscation as bench
+
+    elements, page_maps = bench.load_elements()
+    assert [bench.reference_decode_all_obf_in(el, page_maps) for el in elements] == [
+        obfuscation.decode_all_obf_in(el, page_maps) for el in elements
+    ]
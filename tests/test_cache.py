@@ -0,0 +1,213 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.config import CACHE_TTL_FINAL, CACHE_TTL_LIVE
+from app.core import cache
+from app.core.cache import (
+    FileCacheBackend,
+    SQLiteCacheBackend,
+    cache_read,
+    cache_write,
+    calendar_ttl,
+    match_ttl,
+)
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "file":
+        b = FileCacheBackend(str(tmp_path))
+    else:
+        b = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), batch_size=2)
+    previous = cache._BACKEND
+    cache.set_backend(b)
+    yield b
+    b.flush()
+    cache._BACKEND = previous
+
+
+def test_entries_expire_after_ttl(backend):
+    cache_write("match", "abc", "<html/>", ttl=60, suffix=".html")
+    assert cache_read("match", "abc", suffix=".html") == "<html/>"
+
+    cache_write("match", "old", "<html/>", ttl=-1e9)
+    assert cache_read("match", "old") is None
+
+
+def test_binary_entries_survive_flush(backend):
+    for i in range(5):
+        cache_write("obfcss", f"{i}.woff", bytes([i]) * 3, ttl=None)
+    backend.flush()
+    assert cache_read("obfcss", "4.woff", binary=True) == b"\x04\x04\x04"
+
+
+def test_timed_flushes_reuse_one_connection(tmp_path, monkeypatch):
+    import sqlite3
+    import time
+
+    connects = []
+    connect = sqlite3.connect
+    monkeypatch.setattr(
+        sqlite3, "connect", lambda *a, **kw: connects.append(a) or connect(*a, **kw)
+    )
+    b = SQLiteCacheBackend(str(tmp_path / "c.sqlite3"), batch_size=100, flush_sec=0.01)
+    for i in range(3):
+        b.set("k", str(i), cache.CacheEntry(b"x", 0.0))
+        deadline = time.monotonic() + 2
+        while b._pending and time.monotonic() < deadline:
+            time.sleep(0.005)
+        assert not b._pending
+    # the constructor's connection plus one for the flush thread
+    assert len(connects) == 2
+
+
+def test_ttl_policy():
+    past = (date.today() - timedelta(days=30)).isoformat()
+    today = date.today().isoformat()
+    assert calendar_ttl(past, past) == CACHE_TTL_FINAL
+    assert calendar_ttl(past, today) == CACHE_TTL_LIVE
+
+    yesterday = (date.today() - timedelta(days=1)).strftime("%d.%m.%Y")
+    assert match_ttl(yesterday, "2:1") == CACHE_TTL_FINAL
+    assert match_ttl(yesterday, None) == CACHE_TTL_LIVE
+
+
+def test_payloads_are_compressed_and_legacy_entries_migrated(backend):
+    html = "<html>" + "<td>Heim</td>" * 500 + "</html>"
+    cache_write("match_full", "full_x", html, ttl=None, suffix=".html")
+    assert backend.get("match_full", "full_x.html").encoding == "zlib"
+    assert cache_read("match_full", "full_x", suffix=".html") == html
+
+    backend.set("match", "legacy.html", cache.CacheEntry(html.encode(), 0.0, None))
+    assert cache_read("match", "legacy", suffix=".html") == html
+    migrated = backend.get("match", "legacy.html")
+    assert migrated.encoding == "zlib"
+    assert len(migrated.data) < len(html)
+
+
+def test_incompressible_legacy_entries_are_migrated_once(backend, monkeypatch):
+    woff = bytes(range(256))
+    backend.set("obfcss", "x.woff", cache.CacheEntry(woff, 0.0, None))
+    assert cache.cache_read("obfcss", "x", suffix=".woff", binary=True) == woff
+    assert backend.get("obfcss", "x.woff").encoding == "raw"
+
+    writes = []
+    monkeypatch.setattr(backend, "set", lambda *args: writes.append(args))
+    assert cache.cache_read("obfcss", "x", suffix=".woff", binary=True) == woff
+    assert writes == []
+
+
+def test_obfuscation_map_store_is_bounded_and_persisted(backend, monkeypatch):
+    from app.core import obfuscation
+
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", obfuscation._ObfMapLRU(2))
+    for i in range(3):
+        obfuscation._store_obf_map(f"id{i}", {0xE000 + i: str(i)}, use_cache=True)
+    assert len(obfuscation._OBF_CACHE) == 2
+    assert obfuscation._OBF_CACHE.get("id0") is None
+
+    # evicted from memory, still shared through the cache store
+    assert obfuscation._load_obf_map("id0", use_cache=True) == {0xE000: "0"}
+
+    obfuscation._store_obf_map("broken", {}, use_cache=True)
+    entry = backend.get("obfmap", "broken.json")
+    assert entry.expires_at is not None
+
+
+def test_match_views_share_one_fetch_and_cache_entry(
+    backend, monkeypatch, match_html, obf_maps
+):
+    from app.core import match
+    from app.core.http import Fetched
+    from conftest import MATCH_LINK
+
+    fetched = []
+    monkeypatch.setattr(
+        match,
+        "_fetch_match_html",
+        lambda url, hit=None: fetched.append(url) or Fetched(match_html),
+    )
+    full = match.fetch_match_full(MATCH_LINK)
+    details = match.fetch_match_details(MATCH_LINK)
+    assert len(fetched) == 1
+    assert full["referee"] == "Kai Planz"
+    assert details["staffel_id"] == full["staffel_id"]
+
+    sid = full["game_id"]
+    assert cache_read("match", sid, suffix=".html") == match_html
+    assert cache_read("match_full", f"full_{sid}", suffix=".html") is None
+
+
+def test_validators_persist_and_refresh_restarts_ttl(backend):
+    cache_write("match", "v", "<html/>", ttl=-1, suffix=".html", etag='"e1"')
+    assert cache_read("match", "v", suffix=".html") is None
+    hit = cache.cache_lookup("match", "v", suffix=".html")
+    assert not hit.fresh and hit.value == "<html/>"
+    assert hit.validators() == {"etag": '"e1"', "last_modified": None}
+
+    cache.cache_refresh("match", "v", ttl=60, suffix=".html")
+    backend.flush()
+    assert cache_read("match", "v", suffix=".html") == "<html/>"
+    assert backend.get("match", "v.html").etag == '"e1"'
+
+
+def test_expired_match_page_is_revalidated(backend, monkeypatch, match_html, obf_maps):
+    from app.core import match
+    from app.core.http import Fetched
+    from conftest import MATCH_LINK
+
+    seen = []
+
+    def fake_fetch(url, hit=None):
+        seen.append(hit.etag if hit else None)
+        if hit is not None:
+            return Fetched(None, etag=hit.etag, not_modified=True)
+        return Fetched(match_html, etag='"v1"')
+
+    monkeypatch.setattr(match, "_fetch_match_html", fake_fetch)
+    monkeypatch.setattr(match, "match_ttl", lambda *a: -1)  # expire at once
+    first = match.fetch_match_full(MATCH_LINK)
+
+    parses = []
+    monkeypatch.setattr(match, "_parse_match_page", lambda *a, **kw: parses.append(1))
+    assert match.fetch_match_full(MATCH_LINK) == first
+    assert seen == [None, '"v1"']
+    assert parses == []
+
+
+def test_file_reads_create_no_directories(tmp_path):
+    b = FileCacheBackend(str(tmp_path / "c"))
+    assert b.get("match", "missing.html") is None
+    assert not (tmp_path / "c").exists()
+    b.set("match", "x.html", cache.CacheEntry(b"x", 0.0))
+    assert b.get("match", "x.html").data == b"x"
+
+
+def test_full_batches_are_committed_on_the_flush_thread(tmp_path, monkeypatch):
+    import threading
+    import time
+
+    b = SQLiteCacheBackend(str(tmp_path / "c.sqlite3"), batch_size=2, flush_sec=60)
+    flushed_on = []
+    flush = b.flush
+    monkeypatch.setattr(
+        b, "flush", lambda: flushed_on.append(threading.current_thread()) or flush()
+    )
+    b.set("k", "a", cache.CacheEntry(b"a", 0.0))
+    b.set("k", "b", cache.CacheEntry(b"b", 0.0))
+    deadline = time.monotonic() + 2
+    while b._pending and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert not b._pending
+    assert flushed_on and threading.current_thread() not in flushed_on
+
+
+def test_file_cache_import_into_sqlite(tmp_path):
+    files = FileCacheBackend(str(tmp_path / "files"))
+    files.set("match", "a.html", cache.CacheEntry(b"a", 1.0, None, "raw", '"e"'))
+    files.set("calendar", "b.json", cache.CacheEntry(b"b", 2.0, 99.0))
+    db = SQLiteCacheBackend(str(tmp_path / "c.sqlite3"))
+    assert cache.import_file_cache(str(tmp_path / "files"), db) == 2
+    assert db.get("match", "a.html") == files.get("match", "a.html")
+    assert db.get("calendar", "b.json").expires_at == 99.0
@@ -0,0 +1,145 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core import calendar, utils
+from app.core.calendar import calendar_windows, parse_matches, _merge_area_matches
+
+from conftest import FIXTURES
+
+ROW = (
+    "<tr><td>11:00</td><td>B-Junioren</td><td>Landesliga</td>"
+    '<td class="column-club">{home}</td>'
+    '<td class="column-score"><a href="/spiel/x/-/spiel/{gid}">2 : 1</a></td>'
+    '<td class="column-club">Gast</td></tr>'
+)
+
+
+def _page(*rows: str) -> str:
+    head = '<tr class="row-headline"><td>Samstag, 27.09.2025</td></tr>'
+    return "<table>" + head + "".join(rows) + "</table>"
+
+
+def test_area_matches_are_deduplicated_across_plz():
+    known = {}
+    a = parse_matches(
+        _page(ROW.format(home="A", gid="ID1"), ROW.format(home="B", gid="ID2")), known
+    )
+    b = parse_matches(
+        _page(ROW.format(home="B", gid="ID2"), ROW.format(home="C", gid="ID3")), known
+    )
+
+    # already seen rows are not parsed again
+    assert b[0] is a[1]
+
+    merged = _merge_area_matches([("20095", a), ("20097", b)])
+    assert [m["game_id"] for m in merged] == ["ID1", "ID2", "ID3"]
+    assert merged[1]["plzs"] == ["20095", "20097"]
+
+
+def test_rows_without_game_id_fall_back_to_row_key():
+    row = (
+        "<tr><td>12:00</td><td>x</td><td>y</td>"
+        '<td class="column-club">Heim</td><td class="column-club">Gast</td></tr>'
+    )
+    merged = _merge_area_matches(
+        [("20095", parse_matches(_page(row))), ("20097", parse_matches(_page(row)))]
+    )
+    assert len(merged) == 1
+    assert merged[0]["plzs"] == ["20095", "20097"]
+
+
+@pytest.mark.parametrize("parser", ["html.parser", "lxml"])
+def test_parse_matches_matches_recorded_output(monkeypatch, calendar_html, parser):
+    if parser == "lxml":
+        pytest.importorskip("lxml")
+    monkeypatch.setattr(utils, "HTML_PARSER_BACKEND", parser)
+    expected = json.loads((FIXTURES / "calendar_page.expected.json").read_text("utf-8"))
+    assert parse_matches(calendar_html) == expected
+
+
+def test_calendar_windows_are_aligned():
+    assert calendar_windows("2025-09-03", "2025-09-10", "week") == [
+        ("2025-09-01", "2025-09-07"),
+        ("2025-09-08", "2025-09-14"),
+    ]
+    assert calendar_windows("2025-09-06", "2025-09-07", "day") == [
+        ("2025-09-06", "2025-09-06"),
+        ("2025-09-07", "2025-09-07"),
+    ]
+    assert calendar_windows("2025-09-03", "2025-09-10", "off") == [
+        ("2025-09-03", "2025-09-10")
+    ]
+    assert calendar_windows("heute", "2025-09-10", "week") == [("heute", "2025-09-10")]
+    # auto: a single day stays a day, longer ranges use whole weeks
+    assert calendar_windows("2025-09-06", "2025-09-06", "auto") == [
+        ("2025-09-06", "2025-09-06")
+    ]
+    assert calendar_windows("2025-09-06", "2025-09-07", "auto") == [
+        ("2025-09-01", "2025-09-07")
+    ]
+
+
+def test_ranges_are_fetched_per_window_and_filtered(monkeypatch):
+    calls = []
+
+    def day_row(day: int, gid: str) -> str:
+        head = f'<tr class="row-headline"><td>Samstag, {day:02d}.09.2025</td></tr>'
+        return head + ROW.format(home=f"H{day}", gid=gid)
+
+    async def fake_page(plz, date_from, date_to, offset, max_results, use_cache):
+        calls.append((date_from, date_to))
+        start = int(date_from[-2:])
+        rows = "".join(day_row(d, f"ID{d}") for d in range(start, start + 7))
+        return {"html": f"<table>{rows}</table>", "final": True, "lastIndex": 0}
+
+    monkeypatch.setattr(calendar, "afetch_calendar_page", fake_page)
+    monkeypatch.setattr(
+        calendar,
+        "calendar_windows",
+        lambda a, b: calendar_windows(a, b, "week"),
+    )
+    got = asyncio.run(
+        calendar.acollect_matches_for_area("2025-09-03", "2025-09-09", "20095")
+    )
+    assert [m["date_label"] for m in got][0] == "03.09.2025"
+    assert [m["date_label"] for m in got][-1] == "09.09.2025"
+    assert len(got) == 7
+    assert calls == [("2025-09-01", "2025-09-07"), ("2025-09-08", "2025-09-14")]
+
+
+def test_stream_fails_with_a_status_before_the_body(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    async def no_store(*args):
+        return None
+
+    async def fake_page(plz, date_from, date_to, offset, max_results, use_cache):
+        if plz == "20099":
+            raise RuntimeError("upstream down")
+        rows = ROW.format(home="A", gid="ID1") + ROW.format(home="B", gid="ID2")
+        return {"html": _page(rows), "final": True, "lastIndex": 0}
+
+    monkeypatch.setattr(main, "aquery_store", no_store)
+    monkeypatch.setattr(calendar, "afetch_calendar_page", fake_page)
+    client = TestClient(main.app)
+    url = "/matches?from=2025-09-27&to=2025-09-27&stream=1&area="
+
+    r = client.get(url + "20095,20097")
+    assert r.status_code == 200
+    assert [json.loads(line)["home"] for line in r.text.splitlines()] == ["A", "B"]
+    assert client.get(url + "20099").status_code == 502
+    assert client.get(url + "20095,abc").status_code == 422
+    assert client.get(url + ",").status_code == 404
+
+    # the list path answers bad areas with the same status codes
+    url = url.replace("&stream=1", "")
+    assert client.get(url + "20095,20097").status_code == 200
+    for area in ("20099", "20095,abc", ","):
+        assert (
+            client.get(url + area).status_code
+            == client.get(url + area + "&stream=1").status_code
+        )
@@ -0,0 +1,96 @@
+import asyncio
+
+from app.core import enrich
+
+ROWS = [
+    {"game_id": "A1", "link": "/spiel/a", "home": "A", "plzs": ["22041"]},
+    {"game_id": "B1", "link": "/spiel/b", "home": "B"},
+    {"game_id": None, "link": None, "home": "C"},
+]
+
+
+def _patch(monkeypatch, cached=(), fail=()):
+    fetched = []
+
+    def _fetch(link, use_cache=True):
+        fetched.append(link)
+        if link in fail:
+            raise RuntimeError("upstream down")
+        return {"link": link, "home": "detail", "venue": f"venue{link}"}
+
+    monkeypatch.setattr(enrich, "fetch_match_full", _fetch)
+    monkeypatch.setattr(
+        enrich,
+        "read_cached_match_full",
+        lambda link: {"venue": "cached"} if link in cached else None,
+    )
+    return fetched
+
+
+def test_enrich_list_keeps_order_and_row_fields(monkeypatch):
+    fetched = _patch(monkeypatch, cached={"/spiel/a"})
+    out = asyncio.run(enrich.aenrich_match_list(ROWS))
+    assert [m["home"] for m in out] == ["A", "B", "C"]
+    assert out[0]["venue"] == "cached" and out[0]["plzs"] == ["22041"]
+    assert out[1]["venue"] == "venue/spiel/b"
+    assert "venue" not in out[2]
+    assert fetched == ["/spiel/b"]
+
+
+def test_enrich_stream_yields_cached_first_and_survives_errors(monkeypatch):
+    _patch(monkeypatch, cached={"/spiel/b"}, fail={"/spiel/a"})
+
+    async def _rows():
+        for r in ROWS:
+            yield r
+
+    async def _collect():
+        return [m async for m in enrich.aenrich_matches(_rows())]
+
+    out = asyncio.run(_collect())
+    assert out[0]["home"] == "B" and out[0]["venue"] == "cached"
+    assert sorted(m["home"] for m in out) == ["A", "B", "C"]
+    assert "venue" not in next(m for m in out if m["home"] == "A")
+
+
+def test_enrich_stream_bounds_fetches_and_reads_cache_off_the_loop(monkeypatch):
+    import threading
+    import time
+
+    lock = threading.Lock()
+    running, peak, cache_threads = [0], [0], set()
+
+    def _fetch(link, use_cache=True):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.01)
+        with lock:
+            running[0] -= 1
+        return {"link": link, "venue": "v"}
+
+    def _read_cached(link):
+        cache_threads.add(threading.current_thread())
+        return None
+
+    monkeypatch.setattr(enrich, "fetch_match_full", _fetch)
+    monkeypatch.setattr(enrich, "read_cached_match_full", _read_cached)
+    monkeypatch.setattr(enrich, "_ENRICH_BUCKET", enrich.TokenBucket(0, 1))
+
+    async def _rows():
+        for i in range(12):
+            yield {"game_id": f"G{i}", "link": f"/spiel/{i}"}
+
+    async def _collect():
+        return [m async for m in enrich.aenrich_matches(_rows(), concurrency=2)]
+
+    out = asyncio.run(_collect())
+    assert sorted(m["link"] for m in out) == sorted(f"/spiel/{i}" for i in range(12))
+    assert peak[0] <= 2
+    assert threading.main_thread() not in cache_threads
+
+
+def test_enrich_rate_is_a_share_of_the_upstream_limit():
+    assert enrich._enrich_rate(2.5, 0.5) == 1.25
+    assert enrich._enrich_rate(0, 0.5) == 0
+    assert enrich._enrich_rate(2.5, 1) == 0
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import httpx
+
+from app.core import calendar, http
+
+ROW = (
+    "<tr><td>11:00</td><td>B-Junioren</td><td>Landesliga</td>"
+    '<td class="column-club">{home}</td>'
+    '<td class="column-score"><a href="/spiel/x/-/spiel/{gid}">2 : 1</a></td>'
+    '<td class="column-club">Gast</td></tr>'
+)
+HEAD = '<tr class="row-headline"><td>Samstag, 27.09.2025</td></tr>'
+
+
+def _mock_client(monkeypatch, handler):
+    monkeypatch.setattr(
+        http,
+        "_new_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(http, "_ASYNC_CLIENT", None)
+    monkeypatch.setattr(http, "_ASYNC_CLIENT_LOOP", None)
+
+
+def test_area_pages_are_fetched_concurrently_and_merged_in_order(monkeypatch):
+    plzs = ["20095", "20097", "20099"]
+    started = []
+    in_flight, peak = [0], [0]
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        parts = request.url.path.split("/")
+        plz, offset = parts[parts.index("plz") + 1], int(parts[-1])
+        started.append(plz)
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        # the first PLZ answers last; only possible if all are in flight
+        for _ in range(100):
+            if len(set(started)) == len(plzs) or plz != plzs[0]:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01 * (len(plzs) - plzs.index(plz)))
+        in_flight[0] -= 1
+        # two pages per PLZ; 20097 also lists the first game of 20095
+        gid = f"G{plz}P{offset}" if plz != "20097" or offset else "G20095P0"
+        body = {
+            "html": f"<table>{HEAD}{ROW.format(home=plz, gid=gid)}</table>",
+            "final": offset > 0,
+            "lastIndex": offset,
+        }
+        return httpx.Response(200, text=json.dumps(body))
+
+    _mock_client(monkeypatch, handler)
+
+    async def no_wait(url):
+        return None
+
+    monkeypatch.setattr(http, "aacquire", no_wait)
+    got = asyncio.run(
+        calendar.acollect_matches_for_area(
+            "2025-09-27", "2025-09-27", ",".join(plzs), use_cache=False
+        )
+    )
+    assert peak[0] == len(plzs)
+    assert [m["game_id"] for m in got] == [
+        "G20095P0",
+        "G20095P1",
+        "G20097P1",
+        "G20099P0",
+        "G20099P1",
+    ]
+    assert got[0]["plzs"] == ["20095", "20097"]
+
+
+def test_client_of_a_finished_loop_is_closed(monkeypatch):
+    _mock_client(monkeypatch, lambda request: httpx.Response(200))
+
+    async def client():
+        return http.get_async_client()
+
+    async def replace():
+        new = http.get_async_client()
+        await asyncio.sleep(0)
+        return new
+
+    first = asyncio.run(client())
+    second = asyncio.run(replace())
+    assert first is not second
+    assert first.is_closed and not second.is_closed
+    asyncio.run(http.aclose_async_client())
+    assert second.is_closed
+
+
+def test_calendar_cache_io_runs_off_the_event_loop(monkeypatch):
+    import threading
+
+    threads = []
+
+    def record(name):
+        def fn(*args, **kwargs):
+            threads.append((name, threading.current_thread()))
+
+        return fn
+
+    body = {"html": f"<table>{HEAD}</table>", "final": True, "lastIndex": 0}
+    _mock_client(monkeypatch, lambda r: httpx.Response(200, text=json.dumps(body)))
+
+    async def no_wait(url):
+        return None
+
+    monkeypatch.setattr(http, "aacquire", no_wait)
+    monkeypatch.setattr(calendar, "cache_lookup", record("lookup"))
+    monkeypatch.setattr(calendar, "cache_write", record("write"))
+    page = asyncio.run(
+        calendar.afetch_calendar_page("20095", "2025-09-27", "2025-09-27", 0, 50)
+    )
+    assert page == body
+    assert [name for name, _ in threads] == ["lookup", "write"]
+    assert threading.main_thread() not in {t for _, t in threads}
@@ -0,0 +1,90 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core import cache, match
+
+
+def _fake_fetch(link, use_cache=True):
+    if "missing" in link:
+        return None
+    if "boom" in link:
+        raise RuntimeError("upstream down")
+    return {"link": link, "home_team": "A", "away_team": "B"}
+
+
+def test_match_link_for_game_id_and_link():
+    gid = "02U3863ODC000000VS5489BUVS8CK5KT"
+    assert match.match_link_for(gid).endswith(f"/spiel/-/spiel/{gid}")
+    assert match.match_link_for("/spiel/x") == "/spiel/x"
+
+
+def test_batch_details_keeps_input_order(monkeypatch):
+    monkeypatch.setattr(match, "fetch_match_full", _fake_fetch)
+    items = ["/spiel/a", "/spiel/missing", "/spiel/boom", "/spiel/b"]
+    with TestClient(main.app) as client:
+        r = client.post("/matches/details", json={"items": items})
+    assert r.status_code == 200
+    data = r.json()
+    assert [d["index"] for d in data] == [0, 1, 2, 3]
+    assert data[0]["match"]["link"] == "/spiel/a"
+    assert data[1]["error"] == "Match nicht gefunden oder lesbar"
+    assert data[2]["error"].startswith("RuntimeError")
+    assert "match" not in data[2]
+
+
+def test_batch_details_stream(monkeypatch):
+    monkeypatch.setattr(match, "fetch_match_full", _fake_fetch)
+    items = ["/spiel/a", "/spiel/b", "/spiel/missing"]
+    with TestClient(main.app) as client:
+        r = client.post("/matches/details?stream=1", json={"items": items})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(x) for x in r.text.splitlines() if x]
+    assert sorted(d["index"] for d in lines) == [0, 1, 2]
+
+
+def test_batch_details_rejects_empty():
+    with TestClient(main.app) as client:
+        r = client.post("/matches/details", json={"items": []})
+    assert r.status_code == 422
+
+
+def _record(home):
+    return {"full": {"home_team": home, "date_label": None}, "details": {}}
+
+
+def _put_parsed(sid, version, record):
+    payload = {"v": version, "data": record}
+    cache.cache_write("match_parsed", sid, json.dumps(payload), None, ".json")
+
+
+def _no_parse(*args, **kwargs):
+    raise AssertionError("fresh match_parsed hit must not be re-parsed")
+
+
+def test_fresh_parsed_match_skips_the_parser(monkeypatch):
+    sid = "02U3863ODC000000VS5489BUVS8CK5KT"
+    _put_parsed(sid, match.MATCH_PARSER_VERSION, _record("Cached"))
+    monkeypatch.setattr(match, "_parse_match_page", _no_parse)
+    monkeypatch.setattr(match, "_load_match_html", _no_parse)
+    got = match.fetch_match_page(match.match_link_for(sid))
+    assert got["full"]["home_team"] == "Cached"
+
+
+def test_parsed_match_of_an_old_parser_version_is_reparsed(monkeypatch):
+    sid = "02U3863ODC000000VS5489BUVS8CK5KT"
+    _put_parsed(sid, "0", _record("Stale"))
+    cache.cache_write("match", sid, "<html></html>", None, ".html")
+    parsed = []
+
+    def fake_parse(html, url, use_cache=True):
+        parsed.append(url)
+        return _record("Fresh")
+
+    monkeypatch.setattr(match, "_parse_match_page", fake_parse)
+    got = match.fetch_match_page(match.match_link_for(sid))
+    assert got["full"]["home_team"] == "Fresh" and len(parsed) == 1
+    # the re-parsed record replaces the old entry under the current version
+    payload = json.loads(cache.cache_read("match_parsed", sid, suffix=".json"))
+    assert payload["v"] == match.MATCH_PARSER_VERSION
@@ -0,0 +1,62 @@
+from fastapi.testclient import TestClient
+
+from app.core import http, metrics
+from app.core.calendar import parse_matches
+from app.core.metrics import Counter, Histogram, upstream_kind
+from app.main import app
+
+
+class _Resp:
+    status_code = 304
+    text = ""
+    headers = {}
+
+
+def test_histogram_renders_cumulative_buckets():
+    h = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+    h.observe(0.05, stage="a")
+    h.observe(0.5, stage="a")
+    h.observe(5, stage="a")
+    text = "\n".join(h.render())
+    metrics._REGISTRY.remove(h)
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="a"} 3' in text
+    assert "# TYPE t_seconds histogram" in text
+
+
+def test_counter_escapes_label_values():
+    c = Counter("t_total", "test", ("key",))
+    c.inc(key='a"b')
+    c.inc(2, key='a"b')
+    text = "\n".join(c.render())
+    metrics._REGISTRY.remove(c)
+    assert 't_total{key="a\\"b"} 3' in text
+
+
+def test_upstream_kind():
+    assert upstream_kind("https://x/ajax.match.calendar.loadmore/-/plz/1") == "calendar"
+    assert upstream_kind("https://x/spiel/a/-/spiel/ID") == "match"
+    assert upstream_kind("https://x/getPostalCodeCompletions/plz/Ha") == "postal"
+    assert upstream_kind("https://x/export.fontface/-/id/ab/type/font") == "woff"
+
+
+def test_hot_paths_are_recorded(monkeypatch, calendar_html):
+    monkeypatch.setattr(http.SESSION, "get", lambda url, **kw: _Resp())
+    monkeypatch.setattr(http, "acquire", lambda url: None)
+
+    sent = metrics.UPSTREAM_REQUESTS.value(kind="match", status="304")
+    parsed = metrics.PARSE_SECONDS.count(stage="calendar")
+    http.get_text("https://x.test/spiel/a/-/spiel/ID")
+    parse_matches(calendar_html)
+    assert metrics.UPSTREAM_REQUESTS.value(kind="match", status="304") == sent + 1
+    assert metrics.PARSE_SECONDS.count(stage="calendar") == parsed + 1
+
+
+def test_metrics_endpoint():
+    r = TestClient(app).get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert "# TYPE fbde_upstream_requests_total counter" in r.text
+    assert "# TYPE fbde_parse_seconds histogram" in r.text
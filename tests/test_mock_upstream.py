@@ -0,0 +1,77 @@
+from fastapi.testclient import TestClient
+
+from app.core import calendar, http, obfuscation
+from app.core.http import Fetched
+from benchmarks.mock_upstream import Settings, create_app
+
+CAL = (
+    "/ajax.match.calendar.loadmore/-/datum-bis/2025-09-28/datum-von/2025-09-22"
+    "/mime-type/JSON/plz/20095/max/10/offset/{}"
+)
+
+
+def _route_session_to(monkeypatch, client):
+    def fake_get(url, timeout=None, allow_redirects=True, headers=None):
+        headers = {k: v for k, v in (headers or {}).items() if v is not None}
+        return client.get(url, headers=headers, follow_redirects=allow_redirects)
+
+    monkeypatch.setattr(http.SESSION, "get", fake_get)
+    monkeypatch.setattr(http, "acquire", lambda url: None)
+
+
+def test_loadmore_protocol_is_paginated():
+    client = TestClient(create_app(Settings(pages=2)))
+    first = client.get(CAL.format(0)).json()
+    last = client.get(CAL.format(10)).json()
+    assert (first["final"], first["lastIndex"]) == (False, 9)
+    assert (last["final"], last["lastIndex"]) == (True, 19)
+
+
+def test_scraper_walks_mock_calendar(monkeypatch):
+    client = TestClient(create_app(Settings(pages=3)))
+    _route_session_to(monkeypatch, client)
+    monkeypatch.setattr(calendar, "BASE", "http://testserver")
+    rows = list(
+        calendar.iter_matches_for_plz(
+            "20095", "2025-09-22", "2025-09-28", page_size=10, use_cache=False
+        )
+    )
+    assert len(rows) == 30
+    assert len({m["game_id"] for m in rows}) == 30
+    assert rows[0]["date_label"] == "22.09.2025"
+    assert rows[-1]["link"].startswith("http://testserver/spiel/")
+
+
+def test_etag_and_error_rate():
+    client = TestClient(create_app())
+    r = client.get(CAL.format(0))
+    again = client.get(CAL.format(0), headers={"if-none-match": r.headers["etag"]})
+    assert again.status_code == 304
+    failing = TestClient(create_app(Settings(error_rate=1.0)))
+    assert failing.get(CAL.format(0)).status_code == 503
+
+
+def test_postal_completions():
+    client = TestClient(create_app(Settings(plzs_per_city=2)))
+    path = "/public.service/-/action/getPostalCodeCompletions/plz/{}"
+    cities = {e["city"] for e in client.get(path.format("Ham")).json()}
+    assert cities == {"Hamburg", "Hamm"}
+    assert [e["postalCode"] for e in client.get(path.format("2009")).json()] == [
+        "20095",
+        "20096",
+    ]
+
+
+def test_font_url_honors_base(monkeypatch):
+    urls = []
+
+    def fake_get_bytes(url, **kwargs):
+        urls.append(url)
+        return Fetched(None)
+
+    monkeypatch.setattr(obfuscation, "BASE", "http://127.0.0.1:8001")
+    monkeypatch.setattr(obfuscation, "get_bytes_validated", fake_get_bytes)
+    obfuscation._fetch_obfuscation_font("abc", use_cache=False)
+    assert urls == [
+        "http://127.0.0.1:8001/export.fontface/-/format/woff/id/abc/type/font"
+    ]
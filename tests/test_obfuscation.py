@@ -0,0 +1,97 @@
+import time
+
+from app.core import obfuscation, timing
+from app.core.obfuscation import (
+    _collect_obfuscation_maps_for_page,
+    _build_obfuscation_map_from_css,
+    _build_obfuscation_map_from_font,
+    _decode_obfuscated_text,
+    _find_ancestor_obf_id,
+    _obf_scope_resolver,
+    decode_all_obf_in,
+)
+from app.core.utils import make_soup
+
+from conftest import FIXTURES
+
+
+def test_decode_text_maps_entities_chars_and_strips_markup():
+    obf_map = {0xE001: "K", 0xE002: "a", 0xE003: "i"}
+    assert _decode_obfuscated_text("\ue001\ue002\ue003", obf_map) == "Kai"
+    assert _decode_obfuscated_text("&#xE001;&#xE0FF;", obf_map) == "K?"
+    assert _decode_obfuscated_text("<b>\ue001</b>\n &amp; x", obf_map) == "K & x"
+    # without private-use chars the text is left alone
+    assert _decode_obfuscated_text("  plain  text ", obf_map) == "plain text"
+
+
+def test_scope_resolution_matches_ancestor_walk(match_html):
+    soup = make_soup(match_html)
+    resolve = _obf_scope_resolver()
+    strings = list(soup.find("body").strings)
+    assert any(_find_ancestor_obf_id(s) for s in strings)
+    assert [resolve(s.parent) for s in strings] == [
+        _find_ancestor_obf_id(s) for s in strings
+    ]
+
+
+def test_decode_all_obf_in(match_html, obf_maps):
+    soup = make_soup(match_html)
+    date = soup.select_one(".stage .stage-header .date-wrapper .date")
+    assert decode_all_obf_in(date, obf_maps) == "Donnerstag, 25.09.2025 | 18:30 Uhr"
+
+
+def test_font_map_matches_css_map():
+    woff = (FIXTURES / "obfuscation.woff").read_bytes()
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    assert _build_obfuscation_map_from_font(woff) == _build_obfuscation_map_from_css(
+        css
+    )
+
+
+def test_font_is_only_fetched_when_css_yields_no_map(monkeypatch):
+    css = (FIXTURES / "obfuscation.css").read_text("utf-8")
+    woff = (FIXTURES / "obfuscation.woff").read_bytes()
+    fonts = []
+
+    def fake_css(obf_id, css_tpl, use_cache):
+        with timing.stage("upstream"):
+            return css if obf_id == "good" else ""
+
+    def fake_font(obf_id, use_cache):
+        fonts.append(obf_id)
+        return woff
+
+    monkeypatch.setattr(obfuscation, "_fetch_obfuscation_css", fake_css)
+    monkeypatch.setattr(obfuscation, "_fetch_obfuscation_font", fake_font)
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", obfuscation._ObfMapLRU(4))
+    soup = make_soup(
+        '<body data-obfuscation-stylesheet="//x/%ID%.css">'
+        '<span data-obfuscation="good"></span><span data-obfuscation="bad"></span>'
+    )
+    timings, token = timing.begin_request()
+    try:
+        maps = _collect_obfuscation_maps_for_page(soup, use_cache=False)
+    finally:
+        timing.end_request(timings, token)
+
+    assert fonts == ["bad"]
+    assert maps["good"] == maps["bad"] == _build_obfuscation_map_from_css(css)
+    # stages recorded in the pool threads reach the request's timings
+    assert timings.stages["upstream"][1] == 2
+
+
+def test_persisted_negative_map_keeps_its_expiry(monkeypatch):
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", obfuscation._ObfMapLRU(4))
+    obfuscation._store_obf_map("gone", {}, use_cache=True)
+    # another worker loads the map later, close to the stored expiry
+    monkeypatch.setattr(obfuscation, "_OBF_CACHE", obfuscation._ObfMapLRU(4))
+    now = time.time()
+    monkeypatch.setattr(
+        obfuscation.time, "time", lambda: now + obfuscation.OBF_NEGATIVE_TTL - 1
+    )
+    assert obfuscation._load_obf_map("gone", use_cache=True) == {}
+    # and drops it when that expiry passes, instead of re-arming the TTL
+    monkeypatch.setattr(
+        obfuscation.time, "time", lambda: now + obfuscation.OBF_NEGATIVE_TTL + 1
+    )
+    assert obfuscation._OBF_CACHE.get("gone") is None
@@ -0,0 +1,43 @@
+import pytest
+
+from app.core import match, utils
+from app.core.calendar import parse_matches
+from app.core.http import Fetched
+
+from conftest import MATCH_LINK
+
+pytest.importorskip("lxml")
+
+
+def _with_parser(monkeypatch, name, fn):
+    monkeypatch.setattr(utils, "HTML_PARSER_BACKEND", name)
+    return fn()
+
+
+def test_calendar_output_is_backend_independent(monkeypatch, calendar_html):
+    slow = _with_parser(
+        monkeypatch, "html.parser", lambda: parse_matches(calendar_html)
+    )
+    fast = _with_parser(monkeypatch, "lxml", lambda: parse_matches(calendar_html))
+    assert fast == slow
+    assert len(fast) == 51
+
+
+def test_match_output_is_backend_independent(monkeypatch, match_html, obf_maps):
+    monkeypatch.setattr(
+        match, "_fetch_match_html", lambda url, hit=None: Fetched(match_html)
+    )
+
+    def full():
+        return match.fetch_match_full(MATCH_LINK, use_cache=False)
+
+    def details():
+        return match.fetch_match_details(MATCH_LINK, use_cache=False)
+
+    assert _with_parser(monkeypatch, "lxml", full) == _with_parser(
+        monkeypatch, "html.parser", full
+    )
+    assert _with_parser(monkeypatch, "lxml", details) == _with_parser(
+        monkeypatch, "html.parser", details
+    )
+    assert _with_parser(monkeypatch, "lxml", full)["referee"] == "Kai Planz"
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core import postal
+
+HAMBURG = [
+    {"postalCode": "22041", "city": "Hamburg", "district": "Wandsbek"},
+    {"postalCode": "22043", "city": "Hamburg", "district": "Jenfeld"},
+    {"postalCode": "21029", "city": "Hamburg", "district": "Bergedorf"},
+]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+    store = {}
+
+    def fake_get_json(url, timeout=None):
+        q = url.rsplit("/", 1)[-1]
+        calls.append(q)
+        return [
+            dict(e)
+            for e in HAMBURG
+            if any(v.casefold().startswith(q.casefold()) for v in e.values())
+        ]
+
+    monkeypatch.setattr(postal, "get_json", fake_get_json)
+    monkeypatch.setattr(postal, "_INDEX", postal._PostalIndex(16, 3, 10))
+    monkeypatch.setattr(
+        postal, "cache_read", lambda cat, key, suffix="": store.get((cat, key))
+    )
+    monkeypatch.setattr(
+        postal,
+        "cache_write",
+        lambda cat, key, value, ttl, suffix="": store.__setitem__((cat, key), value),
+    )
+    return calls, store
+
+
+def test_repeated_and_narrowed_queries_skip_upstream(upstream):
+    calls, _ = upstream
+    assert postal.get_postal_codes("Ham") == HAMBURG
+    assert postal.get_postal_codes(" ham ") == HAMBURG
+    # answered from "ham" in upstream order
+    assert [e["postalCode"] for e in postal.get_postal_codes("Hamburg")] == [
+        "22041",
+        "22043",
+        "21029",
+    ]
+    assert calls == ["Ham"]
+
+    assert len(postal.get_postal_codes("220")) == 2
+    assert [e["district"] for e in postal.get_postal_codes("2204")] == [
+        "Wandsbek",
+        "Jenfeld",
+    ]
+    assert postal._resolve_plz_inputs("Hamb") == ["22041", "22043", "21029"]
+    assert calls == ["Ham", "220"]
+
+
+def test_short_queries_and_other_workers_use_the_cache(upstream):
+    calls, store = upstream
+    postal.get_postal_codes("Ha")
+    postal._INDEX = postal._PostalIndex(16, 3, 10)
+    assert postal.get_postal_codes("Ha") == HAMBURG
+    # "ha" is shorter than the minimum prefix, so "han" goes upstream
+    postal.get_postal_codes("Han")
+    assert calls == ["Ha", "Han"]
+    assert ("postal", "ha") in store
+
+
+def test_results_at_the_upstream_cap_do_not_answer_longer_queries(upstream):
+    calls, _ = upstream
+    postal._INDEX = postal._PostalIndex(16, 3, len(HAMBURG))
+    postal.get_postal_codes("Ham")
+    # "ham" may have been cut off upstream, so "hamb" is asked for itself
+    assert len(postal.get_postal_codes("Hamb")) == 3
+    assert postal.get_postal_codes("Ham") == HAMBURG
+    assert calls == ["Ham", "Hamb"]
+
+
+def test_async_lookup_reads_the_cache_off_the_event_loop(upstream, monkeypatch):
+    _, store = upstream
+    store[("postal", "hamburg")] = '[{"postalCode": "22041"}]'
+    threads = []
+    read = postal.cache_read
+
+    def recording_read(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return read(*args, **kwargs)
+
+    monkeypatch.setattr(postal, "cache_read", recording_read)
+    got = asyncio.run(postal.aget_postal_codes("Hamburg"))
+    assert got == [{"postalCode": "22041"}]
+    assert threads and threading.main_thread() not in threads
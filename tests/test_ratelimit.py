@@ -0,0 +1,25 @@
+import time
+
+from app.core.ratelimit import TokenBucket
+
+
+def test_burst_is_free_then_paced():
+    bucket = TokenBucket(rate=50, burst=3)
+    t0 = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    assert time.monotonic() - t0 < 0.02
+
+    t0 = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    # 5 tokens at 50/s -> ~0.1s
+    assert time.monotonic() - t0 >= 0.08
+
+
+def test_zero_rate_disables_limit():
+    bucket = TokenBucket(rate=0, burst=1)
+    t0 = time.monotonic()
+    for _ in range(100):
+        bucket.acquire()
+    assert time.monotonic() - t0 < 0.05
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.core import http
+from app.core.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class _Resp:
+    status_code = 200
+    text = "<html>ok</html>"
+    headers = {}
+
+
+def test_concurrent_get_text_shares_one_request(monkeypatch):
+    calls = []
+    gate = threading.Event()
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        gate.wait(1)
+        return _Resp()
+
+    monkeypatch.setattr(http.SESSION, "get", fake_get)
+    monkeypatch.setattr(http, "acquire", lambda url: None)
+    with ThreadPoolExecutor(8) as pool:
+        futs = [pool.submit(http.get_text, "https://x.test/a") for _ in range(8)]
+        time.sleep(0.05)
+        gate.set()
+        results = [f.result() for f in futs]
+    assert results == [_Resp.text] * 8
+    assert calls == ["https://x.test/a"]
+    assert len(http._FLIGHTS) == 0
+
+
+def test_flight_key_depends_on_headers():
+    a = http._flight_key("text", "https://x.test/a", None)
+    b = http._flight_key("text", "https://x.test/a", {"x-requested-with": None})
+    assert a != b
+    assert a == http._flight_key("text", "https://x.test/a", {})
+
+
+def test_errors_are_shared_and_key_is_released():
+    flights = SingleFlight()
+    with pytest.raises(ValueError):
+        flights.do("k", lambda: (_ for _ in ()).throw(ValueError("boom")))
+    assert flights.do("k", lambda: 1) == (1, False)
+
+
+def test_async_single_flight_survives_cancelled_caller():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return {"v": 1}
+
+    async def main():
+        first = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == ({"v": 1}, True)
+    assert calls == [1]
+    assert len(flights) == 0
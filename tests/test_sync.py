@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core import sync
+from app.core.store import MatchStore
+
+
+def _m(gid, day, time="11:00", home="A"):
+    return {
+        "date_label": f"{day:02d}.09.2025",
+        "time": time,
+        "home": home,
+        "away": "B",
+        "game_id": gid,
+        "link": f"https://www.fussball.de/spiel/x/-/spiel/{gid}",
+    }
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = MatchStore(str(tmp_path / "matches.sqlite3"))
+    monkeypatch.setattr(sync, "get_store", lambda: s)
+    monkeypatch.setattr(sync, "SYNC_PLZS", "20095,20097")
+    monkeypatch.setattr(sync, "SYNC_GRANULARITY", "week")
+    return s
+
+
+def test_store_upserts_by_game_id_and_drops_vanished_links(store):
+    week = ("2025-09-01", "2025-09-07")
+    store.replace_window("20095", *week, [_m("G1", 2), _m("G2", 3)])
+    store.replace_window("20097", *week, [_m("G2", 3, home="A2")])
+    got = store.query(["20095", "20097"], "2025-09-01", "2025-09-07")
+    assert [m["game_id"] for m in got] == ["G1", "G2"]
+    assert got[1]["home"] == "A2" and got[1]["plzs"] == ["20095", "20097"]
+
+    # G1 cancelled upstream: gone after the next sync of that window
+    store.replace_window("20095", *week, [_m("G2", 3)])
+    got = store.query(["20095"], "2025-09-02", "2025-09-07")
+    assert [m["game_id"] for m in got] == ["G2"]
+
+
+def test_near_windows_are_due_more_often(store, monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_PAST_DAYS", 0)
+    monkeypatch.setattr(sync, "SYNC_FUTURE_DAYS", 13)
+    monkeypatch.setattr(sync, "SYNC_NEAR_DAYS", 1)
+    monkeypatch.setattr(sync, "SYNC_NEAR_INTERVAL", 60)
+    monkeypatch.setattr(sync, "SYNC_FAR_INTERVAL", 3600)
+    today = date(2025, 9, 3)
+    jobs = sync.due_jobs(store, ["20095"], now=1000.0, today=today)
+    assert len(jobs) == 3
+    for _, wf, wt in jobs:
+        store.replace_window("20095", wf, wt, [], synced_at=1000.0)
+    assert sync.due_jobs(store, ["20095"], now=1030.0, today=today) == []
+    assert sync.due_jobs(store, ["20095"], now=1100.0, today=today) == [
+        ("20095", "2025-09-01", "2025-09-07")
+    ]
+
+
+def test_matches_served_from_store_with_staleness(store, monkeypatch):
+    monkeypatch.setattr(sync, "SYNC_MAX_STALE", None)
+    store.replace_window("20095", "2025-09-01", "2025-09-07", [_m("G1", 2)])
+
+    assert asyncio.run(sync.aquery_store("2025-09-01", "2025-09-14", ["20095"])) is None
+    # no lifespan here: the background sync must not start in tests
+    r = TestClient(main.app).get(
+        "/matches",
+        params={"from": "2025-09-02", "to": "2025-09-04", "area": "20095"},
+    )
+    assert r.status_code == 200
+    assert r.headers["x-data-source"] == "store"
+    assert int(r.headers["x-data-age"]) >= 0
+    assert [m["game_id"] for m in r.json()] == ["G1"]
+
+
+def test_only_the_lease_holder_syncs(store, monkeypatch):
+    calls = []
+    monkeypatch.setattr(sync, "sync_window", lambda s, plz, wf, wt: calls.append(plz))
+    monkeypatch.setattr(
+        sync, "due_jobs", lambda s, plzs: [("20095", "2025-09-01", "2025-09-07")]
+    )
+    assert store.acquire_lease("worker-a", 60)
+    assert sync.run_sync_once(store, ["20095"], owner="worker-b") == 0
+    assert calls == []
+    assert sync.run_sync_once(store, ["20095"], owner="worker-a") == 1
+
+    # an expired lease is taken over, a released one right away
+    assert store.acquire_lease(
+        "worker-b", 60, now=time.time() + sync.SYNC_LEASE_TTL + 1
+    )
+    store.release_lease("worker-b")
+    assert store.acquire_lease("worker-a", 60)
+
+
+def test_store_lookup_keeps_resolution_errors(store, monkeypatch):
+    async def down(area):
+        raise RuntimeError("postal upstream down")
+
+    monkeypatch.setattr(main, "_aresolve_plz_inputs", down)
+    r = TestClient(main.app).get(
+        "/matches",
+        params={"from": "2025-09-02", "to": "2025-09-04", "area": "Hamburg"},
+    )
+    assert r.status_code == 502
@@ -0,0 +1,86 @@
+import pstats
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core import timing
+from app.core.timing import begin_request, end_request, stage, staged
+
+
+def _fake_fetch(link, use_cache=True):
+    with stage("upstream"):
+        pass
+    return {"link": link, "home_team": "A", "away_team": "B"}
+
+
+def test_stage_is_noop_outside_a_request():
+    with stage("parse"):
+        pass
+    timings, token = begin_request()
+
+    @staged("parse")
+    def parse():
+        return 1
+
+    parse()
+    parse()
+    end_request(timings, token)
+    assert timings.stages["parse"][1] == 2
+    assert "parse;dur=" in timings.header()
+    assert "(2x)" in timings.header()
+
+
+def test_server_timing_header(monkeypatch):
+    monkeypatch.setattr(main, "fetch_match_full", _fake_fetch)
+    client = TestClient(main.app)
+    r = client.get("/match", params={"link": "/spiel/a"})
+    assert r.status_code == 200
+    # opt-in: not sent unless SERVER_TIMING is set
+    assert "server-timing" not in r.headers
+
+    monkeypatch.setattr(main, "SERVER_TIMING", True)
+    r = client.get("/match", params={"link": "/spiel/a"})
+    names = [p.split(";")[0] for p in r.headers["server-timing"].split(", ")]
+    assert {"upstream", "endpoint", "validate", "total"} <= set(names)
+    assert "x-profile-dump" not in r.headers
+
+
+def test_profile_on_admin_header(monkeypatch, tmp_path):
+    monkeypatch.setattr(main, "fetch_match_full", _fake_fetch)
+    monkeypatch.setattr(main, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(timing, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(timing, "PROFILE_DIR", str(tmp_path))
+    client = TestClient(main.app)
+
+    r = client.get("/match", params={"link": "/spiel/a"}, headers={"x-profile": "no"})
+    assert "x-profile-dump" not in r.headers
+
+    r = client.get(
+        "/match", params={"link": "/spiel/a"}, headers={"x-profile": "secret"}
+    )
+    dump = tmp_path / r.headers["x-profile-dump"]
+    stats = pstats.Stats(str(dump))
+    assert any(fn[2] == "_fake_fetch" for fn in stats.stats)
+
+
+def test_profiled_request_with_a_threaded_stage(tmp_path, monkeypatch):
+    import asyncio
+
+    monkeypatch.setattr(timing, "PROFILE_DIR", str(tmp_path))
+
+    @staged("parse")
+    def _threaded_work():
+        return sum(range(1000))
+
+    async def request():
+        timings, token = begin_request(profile=True)
+        try:
+            await asyncio.to_thread(_threaded_work)
+        finally:
+            name = end_request(timings, token, "threaded")
+        return timings, name
+
+    timings, name = asyncio.run(request())
+    assert timings.stages["parse"][1] == 1
+    stats = pstats.Stats(str(tmp_path / name))
+    assert any(fn[2] == "_threaded_work" for fn in stats.stats)